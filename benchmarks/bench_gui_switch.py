@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("PRECONSOL_GUI_CACHE", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "preconsol_gui"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from PySide6.QtWidgets import QApplication
+
+from synthetic import write_synthetic_ags
+
+FRAME_BUDGET = 1 / 60
+
+
+def wait_for(condition, timeout: float = 10.0) -> None:
+    app = QApplication.instance()
+    start = time.perf_counter()
+    while not condition():
+        app.processEvents()
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("Timed out waiting for the window")
+    return
+
+
+def run(n_samples: int, n_switches: int) -> dict:
+    # Times switching samples in the main window, from cbx_samples_changed to
+    # the repaint, and the draw alone in result_ready
+    import app as app_module
+
+    qapp = QApplication.instance() or QApplication([])
+    window = app_module.MainWindow()
+    window.resize(1280, 800)
+    window.show()
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = Path(directory) / "switch.ags"
+        write_synthetic_ags(file_name, n_samples=n_samples, noise=0.002)
+        window.workspace.add_files([file_name])
+    window.update_samples()
+    wait_for(lambda: window.base_result is not None)
+
+    draw_times = list()
+    set_result = window.consol.set_result
+
+    def timed_set_result(*args, **kwargs):
+        start = time.perf_counter()
+        set_result(*args, **kwargs)
+        draw_times.append(time.perf_counter() - start)
+        return
+
+    window.consol.set_result = timed_set_result
+    switch_times = list()
+    for i in range(1, n_switches + 1):
+        previous = window.base_result
+        start = time.perf_counter()
+        window.cbx_samples.setCurrentIndex(i % n_samples)
+        wait_for(lambda: window.base_result is not previous)
+        qapp.processEvents()  # Paint
+        switch_times.append(time.perf_counter() - start)
+    window.close()
+    return {
+        "switch_median": float(np.median(switch_times)),
+        "switch_p90": float(np.percentile(switch_times, 90)),
+        "draw_median": float(np.median(draw_times)),
+        "draw_p90": float(np.percentile(draw_times, 90)),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Time switching samples in the GUI against a frame budget."
+    )
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--switches", type=int, default=100)
+    parser.add_argument("--budget-ms", type=float, default=FRAME_BUDGET * 1000)
+    parser.add_argument("--output", default=None, help="JSON file for the timings.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    results = run(args.samples, args.switches)
+    for key, seconds in results.items():
+        print(f"{key:<16} {seconds * 1e3:8.2f} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    # The budget is on the whole switch, from the sample list change to the
+    # paint, not only the redraw within it
+    if results["switch_median"] * 1000 > args.budget_ms:
+        print(
+            f"Median switch takes {results['switch_median'] * 1e3:.1f} ms, over the"
+            f" {args.budget_ms:.1f} ms frame budget",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib as mpl
+
+mpl.use("Agg")
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "preconsol_gui"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app_modules import CasagrandeEngine, Casagrande_PreConsolidation, ProcessAGS
+from app_modules.knee import find_knees, pad_curves
+from app_modules.segmentation import segment_curve, segment_curves, segment_loads
+from synthetic import synthetic_curve, write_synthetic_ags
+
+CURVE_SIZES = (10, 30, 100, 300)
+QUICK_CURVE_SIZES = (10, 100)
+AGS_SAMPLES = (100, 1000)
+QUICK_AGS_SAMPLES = (100,)
+DEFAULT_THRESHOLD = 1.5
+
+
+def measure(function, repeat: int = 5, min_time: float = 0.05) -> dict:
+    # Like timeit.autorange: grow the loop count until one run takes min_time,
+    # then report the best and median time per call over `repeat` runs.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "best": min(timings),
+        "median": float(np.median(timings)),
+        "loops": number,
+    }
+
+
+def bench_curve_stages(n_increments: int, repeat: int) -> dict:
+    loads, voids = synthetic_curve(
+        n_increments=n_increments,
+        noise=0.002,
+        unload_reload_loops=max(1, n_increments // 20),
+        rng=np.random.default_rng(n_increments),
+    )
+    engine = CasagrandeEngine(cache_capacity=0)
+    virgin_loading = segment_curve(loads, voids).virgin_loading
+    asc_loads, asc_voids = loads[virgin_loading], voids[virgin_loading]
+    spline = engine._spline(asc_loads, asc_voids)
+    result = engine.compute(loads, voids)
+    curvature_engine = CasagrandeEngine(cache_capacity=0, knee_method="max_curvature")
+    plot = Casagrande_PreConsolidation(cache_capacity=0)
+    export_plot = Casagrande_PreConsolidation(cache_capacity=0, headless=True)
+    export_plot.set_result(result)
+    linear_plot = Casagrande_PreConsolidation(
+        cache_capacity=0, headless=True, curve_sampling="linear"
+    )
+    linear_plot.set_result(result)
+
+    def export_png(reuse_artists: bool) -> None:
+        export_plot.set_result(result, reuse_artists=reuse_artists)
+        export_plot.get_figure().savefig(io.BytesIO(), format="png", dpi=100)
+        return
+
+    stages = {
+        "segmentation": lambda: segment_curve(loads, voids),
+        "knee": lambda: engine._knee_point(asc_loads, asc_voids, spline),
+        "knee_max_curvature": lambda: curvature_engine._knee_point(
+            asc_loads, asc_voids, spline
+        ),
+        "spline": lambda: engine._spline(asc_loads, asc_voids).derivative(),
+        "straight_line": lambda: engine._determine_peak_slope(
+            asc_loads, asc_voids, result.knee_x
+        ),
+        "intersection": lambda: engine._preconsolidation(result),
+        "compute": lambda: engine.compute(loads, voids),
+        "set_data": lambda: plot.set_data(loads, voids),
+        "curve_adaptive": lambda: export_plot._update_spline_curve(),
+        "curve_linear": lambda: linear_plot._update_spline_curve(),
+        "export_png": lambda: export_png(reuse_artists=False),
+        "export_png_reuse": lambda: export_png(reuse_artists=True),
+        "uncertainty_10k": lambda: engine.uncertainty(result, seed=0),
+        "sweep_12": lambda: engine.sweep(
+            loads, voids, [(k, s) for k in (1, 2, 3) for s in (0, 1e-5, 1e-4, 1e-3)]
+        ),
+    }
+    return {
+        f"{name}/n={n_increments}": measure(function, repeat=repeat)
+        for name, function in stages.items()
+    }
+
+
+def bench_knee_batch(n_samples: int, repeat: int) -> dict:
+    rng = np.random.default_rng(n_samples)
+    curves = [
+        synthetic_curve(
+            n_increments=int(rng.integers(8, 20)),
+            noise=0.002,
+            unload_reload_loops=int(rng.integers(0, 3)),
+            rng=rng,
+        )
+        for _ in range(n_samples)
+    ]
+    all_branches = segment_curves(curves)
+    xs = [b.axial_loads[b.virgin_loading] for b in all_branches]
+    ys = [b.void_ratios[b.virgin_loading] for b in all_branches]
+    padded_loads, lengths = pad_curves([loads for loads, _ in curves])
+    return {
+        f"knee_batch/samples={n_samples}": measure(
+            lambda: find_knees(xs, ys), repeat=repeat
+        ),
+        f"segmentation_batch/samples={n_samples}": measure(
+            lambda: segment_loads(padded_loads, lengths), repeat=repeat
+        ),
+    }
+
+
+def bench_ags_parse(n_samples: int, repeat: int, directory: Path) -> dict:
+    file_name = directory / f"synthetic_{n_samples}.ags"
+    n_rows = write_synthetic_ags(
+        file_name, n_samples=n_samples, unload_reload_loops=1, filler_rows=n_samples
+    )
+    timings = dict()
+    for name, streaming in (("parse_streaming", True), ("parse_full", False)):
+        timings[f"{name}/rows={n_rows}"] = measure(
+            lambda: ProcessAGS(
+                str(file_name), streaming=streaming
+            ).get_cons_for_preconsolidation(),
+            repeat=repeat,
+            min_time=0.0,
+        )
+    return timings
+
+
+def run(quick: bool = False, repeat: int = 5) -> dict:
+    timings = dict()
+    for n_increments in QUICK_CURVE_SIZES if quick else CURVE_SIZES:
+        timings.update(bench_curve_stages(n_increments, repeat))
+    with tempfile.TemporaryDirectory() as directory:
+        for n_samples in QUICK_AGS_SAMPLES if quick else AGS_SAMPLES:
+            timings.update(bench_knee_batch(n_samples, repeat))
+            timings.update(bench_ags_parse(n_samples, repeat, Path(directory)))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "timings": timings,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = list()
+    for key, timing in results["timings"].items():
+        reference = baseline["timings"].get(key)
+        if reference is None:
+            continue
+        ratio = timing["best"] / reference["best"]
+        if ratio > threshold:
+            regressions.append(
+                f"{key}: {timing['best'] * 1e3:.3f} ms vs "
+                f"{reference['best'] * 1e3:.3f} ms baseline ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Time each preconsolidation pipeline stage on synthetic data."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmark_results.json",
+        help="Where to write the timings (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-b", "--baseline", help="Baseline JSON to compare the timings against"
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail when a stage is this many times slower than the baseline "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Write the timings to --baseline instead of comparing",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--quick", action="store_true", help="Only run the smaller sizes"
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    results = run(quick=args.quick, repeat=args.repeat)
+    for key, timing in results["timings"].items():
+        print(f"{key:<32} {timing['best'] * 1e3:10.3f} ms")
+    Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text())
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+GUI_DIR = Path(__file__).resolve().parents[1] / "preconsol_gui"
+HEAVY_MODULES = ("matplotlib", "scipy", "pandas", "python_ags4", "kneed")
+STARTUP_BUDGET = 0.5  # Seconds from launch to the first window
+
+# Run in a fresh interpreter: prints a line when the window is first shown
+# and another when the plot has been built in the background
+CHILD = f"""
+import json, sys
+sys.path.insert(0, {str(GUI_DIR)!r})
+import app
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+qapp = QApplication([])
+window = app.MainWindow()
+window.show()
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]  # Before the preload
+qapp.processEvents()
+print(json.dumps({{"event": "window", "modules": loaded}}), flush=True)
+
+def poll():
+    if window._consol is None:
+        QTimer.singleShot(5, poll)
+        return
+    print(json.dumps({{"event": "plot"}}), flush=True)
+    qapp.quit()
+
+QTimer.singleShot(0, poll)  # quit only ends a running event loop
+qapp.exec()
+"""
+
+
+def import_times(stderr: str) -> dict[str, float]:
+    # Cumulative seconds of each top-level import from -X importtime
+    times = dict()
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)$", line)
+        if match:
+            times[match[2]] = int(match[1]) / 1e6
+    return times
+
+
+def launch() -> dict:
+    # The import times go to a file, as they would fill a pipe not read
+    # until the end
+    with tempfile.TemporaryFile("w+") as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-c", CHILD],
+            stdout=subprocess.PIPE,
+            stderr=errors,
+            text=True,
+            env={**os.environ, "QT_QPA_PLATFORM": "offscreen"},
+        )
+        timings = dict()
+        for line in process.stdout:
+            message = json.loads(line)
+            timings[message["event"]] = time.perf_counter() - start
+            if message["event"] == "window":
+                timings["modules"] = message["modules"]
+        process.wait()
+        errors.seek(0)
+        stderr = errors.read()
+    if process.returncode or "window" not in timings:
+        raise RuntimeError(f"The app did not start:\n{stderr[-2000:]}")
+    timings["imports"] = import_times(stderr)
+    return timings
+
+
+def run(n_runs: int) -> dict:
+    launches = [launch() for _ in range(n_runs)]
+    return {
+        "window_median": float(np.median([t["window"] for t in launches])),
+        "window_max": float(np.max([t["window"] for t in launches])),
+        "plot_median": float(np.median([t["plot"] for t in launches])),
+        "heavy_before_window": launches[-1]["modules"],
+        "app_import": float(np.median([t["imports"]["app"] for t in launches])),
+        "slowest_imports": dict(
+            sorted(
+                launches[-1]["imports"].items(), key=lambda item: item[1], reverse=True
+            )[:10]
+        ),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Time from launching the GUI to its first window."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET * 1000)
+    parser.add_argument("--output", default=None, help="JSON file for the timings.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    results = run(args.runs)
+    for key in ("window_median", "window_max", "plot_median", "app_import"):
+        print(f"{key:<16} {results[key] * 1e3:8.1f} ms")
+    print("Slowest imports, including the background preload:")
+    for module, seconds in results["slowest_imports"].items():
+        print(f"  {module:<40} {seconds * 1e3:8.1f} ms")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    status = 0
+    if results["heavy_before_window"]:
+        print(
+            f"Imported before the window: {', '.join(results['heavy_before_window'])}",
+            file=sys.stderr,
+        )
+        status = 1
+    if results["window_median"] * 1000 > args.budget_ms:
+        print(
+            f"Median time to the first window is over the {args.budget_ms:.0f} ms budget",
+            file=sys.stderr,
+        )
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+from pathlib import Path
+
+import numpy as np
+
+
+def synthetic_curve(
+    n_increments: int = 12,
+    preconsolidation_kpa: float = 150.0,
+    noise: float = 0.0,
+    unload_reload_loops: int = 0,
+    load_range_kpa: tuple[float, float] = (5.0, 3200.0),
+    e0: float = 0.95,
+    recompression_index: float = 0.03,
+    compression_index: float = 0.35,
+    swelling_index: float = 0.02,
+    rng: np.random.Generator | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # A smooth bilinear e-log p curve: recompression below p'c, virgin
+    # compression above it. Unload/reload loops halve the load twice and
+    # return to the same load, swelling and recompressing along Cs.
+    rng = rng or np.random.default_rng()
+    virgin_loads = np.geomspace(*load_range_kpa, n_increments)
+    x = np.log10(virgin_loads / load_range_kpa[0])
+    xc = np.log10(preconsolidation_kpa / load_range_kpa[0])
+    smoothness = 0.1
+    virgin_voids = (
+        e0
+        - recompression_index * x
+        - (compression_index - recompression_index)
+        * smoothness
+        * np.log10(1 + 10 ** ((x - xc) / smoothness))
+    )
+
+    loop_after = set(
+        np.linspace(2, n_increments - 2, unload_reload_loops, dtype=int).tolist()
+        if unload_reload_loops
+        else []
+    )
+    loads, voids = list(), list()
+    for i, (load, void) in enumerate(zip(virgin_loads, virgin_voids)):
+        loads.append(load)
+        voids.append(void)
+        if i in loop_after:
+            for factor in (0.5, 0.25, 0.5):
+                loads.append(load * factor)
+                voids.append(void + swelling_index * np.log10(1 / factor))
+    voids = np.array(voids) + rng.normal(0, noise, len(voids))
+    return np.array(loads), voids
+
+
+def write_synthetic_ags(
+    file_name: str | Path,
+    n_samples: int = 100,
+    n_increments: int = 12,
+    noise: float = 0.002,
+    unload_reload_loops: int = 0,
+    filler_rows: int = 0,
+    seed: int = 0,
+) -> int:
+    # Writes PROJ, an optional filler GEOL group and a CONS group; returns the
+    # number of CONS rows written.
+    rng = np.random.default_rng(seed)
+
+    def row(*values) -> str:
+        return ",".join(f'"{value}"' for value in values) + "\r\n"
+
+    n_rows = 0
+    with open(file_name, "w", newline="") as f:
+        f.write(row("GROUP", "PROJ"))
+        f.write(row("HEADING", "PROJ_ID", "PROJ_NAME"))
+        f.write(row("UNIT", "", ""))
+        f.write(row("TYPE", "ID", "X"))
+        f.write(row("DATA", "SYNTH", "Synthetic oedometer tests"))
+        f.write("\r\n")
+        if filler_rows:
+            f.write(row("GROUP", "GEOL"))
+            f.write(row("HEADING", "LOCA_ID", "GEOL_TOP", "GEOL_BASE", "GEOL_DESC"))
+            f.write(row("UNIT", "", "m", "m", ""))
+            f.write(row("TYPE", "ID", "2DP", "2DP", "X"))
+            for i in range(filler_rows):
+                f.write(
+                    row(
+                        "DATA",
+                        f"BH{i % 100 + 1}",
+                        f"{i * 0.1:.2f}",
+                        f"{i * 0.1 + 0.1:.2f}",
+                        "Firm brown slightly sandy CLAY",
+                    )
+                )
+            f.write("\r\n")
+        f.write(row("GROUP", "CONS"))
+        f.write(
+            row(
+                "HEADING",
+                "LOCA_ID",
+                "SAMP_TOP",
+                "SAMP_REF",
+                "SAMP_TYPE",
+                "SAMP_ID",
+                "SPEC_REF",
+                "SPEC_DPTH",
+                "CONS_INCN",
+                "CONS_INCF",
+                "CONS_INCE",
+            )
+        )
+        f.write(row("UNIT", "", "m", "", "", "", "", "m", "", "kPa", ""))
+        f.write(
+            row("TYPE", "ID", "2DP", "X", "PA", "ID", "X", "2DP", "X", "0DP", "3DP")
+        )
+        for sample in range(n_samples):
+            loca_id = f"BH{sample // 10 + 1}"
+            depth = f"{(sample % 10 + 1) * 1.5:.2f}"
+            loads, voids = synthetic_curve(
+                n_increments=n_increments,
+                preconsolidation_kpa=rng.uniform(50, 400),
+                noise=noise,
+                unload_reload_loops=unload_reload_loops,
+                rng=rng,
+            )
+            for increment, (load, void) in enumerate(zip(loads, voids), start=1):
+                f.write(
+                    row(
+                        "DATA",
+                        loca_id,
+                        depth,
+                        "1",
+                        "U",
+                        f"{loca_id}-{depth}",
+                        "1",
+                        depth,
+                        increment,
+                        f"{load:.0f}",
+                        f"{void:.3f}",
+                    )
+                )
+                n_rows += 1
+    return n_rows
@@ -1,18 +1,22 @@
+import os
 import sys
 
-import matplotlib as mpl
+import numpy as np
 
-mpl.use("QtAgg")
-
-from app_modules import Casagrande_PreConsolidation, ProcessAGS
-from matplotlib.backends.backend_qtagg import NavigationToolbar2QT as NavigationToolbar
-from PySide6.QtCore import QAbstractTableModel, Qt, Signal
+# matplotlib, scipy, pandas and python_ags4 are imported once the window is
+# up, see preload_modules, so only Qt and numpy load before it appears
+from app_modules.profiling import profiler
+from app_modules.workers import JobRunner
+from PySide6.QtCore import QAbstractTableModel, Qt, QTimer, Signal
+from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QApplication,
     QComboBox,
     QFileDialog,
     QHBoxLayout,
+    QLabel,
     QMainWindow,
+    QProgressBar,
     QPushButton,
     QTableView,
     QVBoxLayout,
@@ -20,113 +24,446 @@ from PySide6.QtWidgets import (
 )
 
 
+def preload_modules():
+    # Runs on a worker thread after the window is shown, so building the
+    # plot or loading files does not wait for the imports
+    import matplotlib.backends.backend_qtagg  # noqa: F401
+    from app_modules import casagrande, export, workspace  # noqa: F401
+
+    return
+
+
 class PreconsolidationModel(QAbstractTableModel):
 
-    signal = Signal()
+    COLUMNS = ("CONS_INCF", "CONS_INCE")
+    # PySide6 enum lookups take microseconds and the view calls data for
+    # every cell and role on each repaint, so the members are looked up once
+    ALIGN_CENTER = Qt.AlignCenter
+    DISPLAY_ROLE = Qt.DisplayRole
+    EDIT_ROLE = Qt.EditRole
+    EDITABLE = Qt.ItemIsEditable
+    HORIZONTAL = Qt.Horizontal
+    TEXT_ALIGNMENT_ROLE = Qt.TextAlignmentRole
+
+    signal = Signal(int, int)
 
-    def __init__(self, data):
+    def __init__(self, axial_loads_kpa, void_ratios):
         super(PreconsolidationModel, self).__init__()
-        self._data = data
+        self._columns = [
+            np.array(axial_loads_kpa, dtype=float),
+            np.array(void_ratios, dtype=float),
+        ]
+        self._display = [[self._format(value) for value in c] for c in self._columns]
+
+    @staticmethod
+    def _format(value):
+        return f"{value:g}"
+
+    @staticmethod
+    def _is_valid(column, value):
+        if not np.isfinite(value):
+            return False
+        return value > 0 if column == 0 else value >= 0  # Loads are log scaled
 
     def data(self, index, role):
-        if role == Qt.DisplayRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value)
-        elif role == Qt.TextAlignmentRole:
-            return Qt.AlignCenter
+        if role == self.DISPLAY_ROLE or role == self.EDIT_ROLE:
+            return self._display[index.column()][index.row()]
+        elif role == self.TEXT_ALIGNMENT_ROLE:
+            return self.ALIGN_CENTER
 
     def rowCount(self, index):
-        return self._data.shape[0]
+        return len(self._columns[0])
 
     def columnCount(self, index):
-        return self._data.shape[1]
+        return len(self._columns)
 
     def flags(self, index):
         if not index.isValid():
             return Qt.ItemIsEnabled
 
-        return super().flags(index) | Qt.ItemIsEditable
+        return super().flags(index) | self.EDITABLE
+
+    def get_arrays(self):
+        return self._columns[0].copy(), self._columns[1].copy()
 
     def headerData(self, section, orientation, role):
-        if role == Qt.DisplayRole:
-            if orientation == Qt.Horizontal:
-                return str(self._data.columns[section])
-            if orientation == Qt.Vertical:
-                return str(self._data.index[section])
+        if role == self.DISPLAY_ROLE:
+            if orientation == self.HORIZONTAL:
+                return self.COLUMNS[section]
+            return str(section)
 
     def setData(self, index, value, role):
-        if role == Qt.EditRole:
-            self._data.iloc[index.row(), index.column()] = float(
-                value
-            )  # Hacky conversion to float
-            self.signal.emit()
+        if role == self.EDIT_ROLE:
+            row, column = index.row(), index.column()
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return False
+            if not self._is_valid(column, value):
+                return False
+            if value != self._columns[column][row]:
+                self._columns[column][row] = value
+                self._display[column][row] = self._format(value)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole])
+                self.signal.emit(row, column)
             return True
 
         return False
 
 
 class MainWindow(QMainWindow):
+
+    EDIT_DEBOUNCE_MS = 400
+
     def __init__(self, *args, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
 
-        self.data = None
+        self.base_result = None
         self.title = "Casagrande Preconsolidation Estimation Tool"
         self.setWindowTitle(self.title)
 
-        # Instantiate dependencies
-        self.consol = Casagrande_PreConsolidation()
-        self.canvas = self.consol.get_canvas()
-        self.toolbar = NavigationToolbar(self.canvas, self)
-        self.set_plot_navigation_bar()
+        # Instantiate dependencies. The plot and the workspace are created on
+        # first use, see consol and workspace.
+        self._consol = None
+        self._workspace = None
+        self.preload_runner = JobRunner(parent=self)
+        self.load_runner = JobRunner(parent=self)
+        self.compute_runner = JobRunner(parent=self)
+        self.uncertainty_runner = JobRunner(parent=self)
+        self.export_runner = JobRunner(parent=self)
+        self.edit_timer = QTimer(self)
+        self.edit_timer.setSingleShot(True)
+        self.edit_timer.setInterval(self.EDIT_DEBOUNCE_MS)
 
         # Create widget
-        self.btn_load_ags = QPushButton("Load AGS File ...")
+        self.btn_load_ags = QPushButton("Load AGS Files ...")
         self.cbx_samples = QComboBox()
+        self.btn_reset_handles = QPushButton("Reset Handles")
         self.parent_layout = QHBoxLayout()
         self.plot_layout = QVBoxLayout()
         self.plot_widget = QWidget()
+        self.plot_placeholder = QLabel("Loading plot ...")
+        self.plot_placeholder.setAlignment(Qt.AlignCenter)
         self.table = QTableView()
         self.table_layout = QVBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.lbl_timings = QLabel()
+        self.lbl_timings.setVisible(profiler.is_enabled())
+        self.statusBar().addPermanentWidget(self.lbl_timings)
+        self.act_profile = QAction("Profile Stages", self)
+        self.act_profile.setCheckable(True)
+        self.act_profile.setChecked(profiler.is_enabled())
+        self.act_profile_sample = QAction("Profile Current Sample ...", self)
+        self.act_spline_knee = QAction("Knee From Spline Curvature", self)
+        self.act_spline_knee.setCheckable(True)
+        self.act_uncertainty = QAction("Estimate Uncertainty", self)
+        self.act_clear_workspace = QAction("Clear Workspace", self)
+        self.act_open_store = QAction("Open CONS Store ...", self)
+        self.act_save_store = QAction("Save Workspace As CONS Store ...", self)
+        self.act_export_plots = QAction("Export All Plots ...", self)
+        self.act_export_pdf = QAction("Export All Plots As PDF ...", self)
+        self.tools_menu = self.menuBar().addMenu("&Tools")
+        self.tools_menu.addAction(self.act_open_store)
+        self.tools_menu.addAction(self.act_save_store)
+        self.tools_menu.addAction(self.act_clear_workspace)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.act_export_plots)
+        self.tools_menu.addAction(self.act_export_pdf)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.act_spline_knee)
+        self.tools_menu.addAction(self.act_uncertainty)
+        self.tools_menu.addSeparator()
+        self.tools_menu.addAction(self.act_profile)
+        self.tools_menu.addAction(self.act_profile_sample)
 
         # Connect init signals
+        self.preload_runner.finished.connect(self.modules_preloaded)
+        self.preload_runner.failed.connect(self.job_failed)
         self.btn_load_ags.clicked.connect(self.btn_load_ags_clicked)
         self.cbx_samples.currentIndexChanged.connect(self.cbx_samples_changed)
+        self.load_runner.busy.connect(self.progress_bar.setVisible)
+        self.load_runner.progress.connect(self.progress_bar.setValue)
+        self.load_runner.finished.connect(self.ags_loaded)
+        self.load_runner.failed.connect(self.job_failed)
+        self.compute_runner.finished.connect(self.result_ready)
+        self.compute_runner.failed.connect(self.job_failed)
+        self.uncertainty_runner.finished.connect(self.uncertainty_ready)
+        self.export_runner.busy.connect(self.progress_bar.setVisible)
+        self.export_runner.progress.connect(self.progress_bar.setValue)
+        self.export_runner.finished.connect(self.plots_exported)
+        self.export_runner.failed.connect(self.job_failed)
+        self.uncertainty_runner.failed.connect(self.job_failed)
+        self.edit_timer.timeout.connect(self.recompute_edited)
+        self.act_profile.toggled.connect(self.act_profile_toggled)
+        self.act_profile_sample.triggered.connect(self.act_profile_sample_triggered)
+        self.act_spline_knee.toggled.connect(self.act_spline_knee_toggled)
+        self.act_uncertainty.triggered.connect(self.act_uncertainty_triggered)
+        self.act_clear_workspace.triggered.connect(self.act_clear_workspace_triggered)
+        self.act_open_store.triggered.connect(self.act_open_store_triggered)
+        self.act_save_store.triggered.connect(self.act_save_store_triggered)
+        self.act_export_plots.triggered.connect(self.act_export_plots_triggered)
+        self.act_export_pdf.triggered.connect(self.act_export_pdf_triggered)
+        self.btn_reset_handles.clicked.connect(self.btn_reset_handles_clicked)
 
         # Set layouts
         self.table_layout.addWidget(self.btn_load_ags)
         self.table_layout.addWidget(self.cbx_samples)
         self.table_layout.addWidget(self.table)
-        self.plot_layout.addWidget(self.toolbar)
-        self.plot_layout.addWidget(self.canvas)
+        self.table_layout.addWidget(self.btn_reset_handles)
+        self.plot_layout.addWidget(self.plot_placeholder)
         self.parent_layout.addLayout(self.table_layout, 1)
         self.parent_layout.addLayout(self.plot_layout, 4)
 
         # Create a placeholder widget to hold our toolbar and canvas.
         self.plot_widget.setLayout(self.parent_layout)
         self.setCentralWidget(self.plot_widget)
+        # Started from the event loop, once the window is showing
+        QTimer.singleShot(0, lambda: self.preload_runner.submit(preload_modules))
+        return
+
+    @property
+    def consol(self):
+        if self._consol is None:
+            self.create_plot()
+        return self._consol
+
+    @property
+    def workspace(self):
+        if self._workspace is None:
+            from app_modules import ParsedAGSCache, Workspace
+
+            self.ags_cache = ParsedAGSCache()
+            self._workspace = Workspace(cache=self.ags_cache)
+        return self._workspace
+
+    def act_clear_workspace_triggered(self):
+        self.load_runner.cancel()
+        self.compute_runner.cancel()
+        self.uncertainty_runner.cancel()
+        self.edit_timer.stop()
+        self.workspace.clear()
+        self.update_samples()
+        # Nothing left to show or edit until a sample is selected again
+        self.base_result = None
+        self.table.setModel(None)
+        if self._consol is not None:
+            self._consol.clear()
+            self.toolbar.update()
+        self.statusBar().showMessage("Cleared the workspace", 5000)
+        return
+
+    def act_export_pdf_triggered(self):
+        from app_modules.export import export_pdf
+
+        if not self.cbx_samples.count():
+            self.statusBar().showMessage("Load AGS files to export", 5000)
+            return
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Export all plots ...", "", "PDF files (*.pdf)"
+        )
+        if not file_name:
+            return
+        self.statusBar().showMessage(f"Exporting to {file_name} ...")
+        self.export_runner.submit(
+            export_pdf,
+            self.workspace.get_labels(),
+            self.workspace.get_catalogue().get_samples(),
+            file_name,
+            with_progress=True,
+        )
+        return
+
+    def act_export_plots_triggered(self):
+        from app_modules.export import export_plots
+
+        if not self.cbx_samples.count():
+            self.statusBar().showMessage("Load AGS files to export", 5000)
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Export all plots ...")
+        if not directory:
+            return
+        self.statusBar().showMessage(f"Exporting to {directory} ...")
+        self.export_runner.submit(
+            export_plots,
+            self.workspace.get_labels(),
+            self.workspace.get_catalogue().get_samples(),
+            directory,
+            with_progress=True,
+        )
+        return
+
+    def act_open_store_triggered(self):
+        from app_modules.cons_store import is_cons_store
+
+        directory = QFileDialog.getExistingDirectory(self, "Open CONS store ...")
+        if not directory:
+            return
+        if not is_cons_store(directory):
+            self.statusBar().showMessage(f"{directory} is not a CONS store", 5000)
+            return
+        self.statusBar().showMessage(f"Opening {directory} ...")
+        self.cbx_samples.setCurrentIndex(-1)  # Positions change with the catalogue
+        self.load_runner.submit(self.workspace.open_store, directory)
+        return
+
+    def act_save_store_triggered(self):
+        from app_modules.cons_store import STORE_SUFFIX
+
+        store, _ = QFileDialog.getSaveFileName(
+            self, "Save CONS store ...", "", f"CONS stores (*{STORE_SUFFIX})"
+        )
+        if not store:
+            return
+        if not store.endswith(STORE_SUFFIX):
+            store += STORE_SUFFIX
+        try:
+            self.workspace.save_store(store)
+        except (OSError, ValueError) as error:
+            self.statusBar().showMessage(f"Could not save {store}: {error}", 5000)
+            return
+        self.statusBar().showMessage(f"Saved {store}", 5000)
+        return
+
+    def act_profile_sample_triggered(self):
+        if self.base_result is None:
+            self.statusBar().showMessage("Select a sample to profile", 5000)
+            return
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Save profile ...", "", "Profile files (*.prof)"
+        )
+        if not file_name:
+            return
+        self.consol.get_engine().clear_cache()  # Profile the full computation
+        with profiler.capture(file_name):
+            self.consol.set_data(*self.model.get_arrays())
+            if not profiler.is_enabled():  # Otherwise set_data has rendered already
+                self.canvas.draw()
+        self.base_result = self.consol.get_result()
+        self.show_timings()
+        self.statusBar().showMessage(f"Saved profile to {file_name}", 5000)
+        return
+
+    def act_profile_toggled(self, checked):
+        profiler.set_enabled(checked)
+        profiler.clear()
+        self.lbl_timings.clear()
+        self.lbl_timings.setVisible(checked)
+        if checked:
+            self.statusBar().showMessage(
+                f"Logging stage timings to {profiler.get_log_file()}", 5000
+            )
+        return
+
+    def act_spline_knee_toggled(self, checked):
+        self.consol.get_engine().set_knee_method(
+            "max_curvature" if checked else "kneedle"
+        )
+        if self.base_result is not None:
+            self.set_plot()
+        return
+
+    def act_uncertainty_triggered(self):
+        if self.base_result is None:
+            self.statusBar().showMessage("Select a sample first", 5000)
+            return
+        self.statusBar().showMessage("Estimating uncertainty ...")
+        self.uncertainty_runner.submit(
+            self.consol.get_engine().uncertainty, self.consol.get_result()
+        )
         return
 
     def btn_load_ags_clicked(self, data):
         dlg = QFileDialog(self)
         dlg.setWindowTitle("HELLO!")
-        file_name, _ = dlg.getOpenFileName(
-            self, "Open AGS file ...", "", "AGS files (*.ags)", "AGS files (*.ags)"
+        file_names, _ = dlg.getOpenFileNames(
+            self, "Open AGS files ...", "", "AGS files (*.ags)", "AGS files (*.ags)"
         )
-        try:
-            ags = ProcessAGS(file_name)
-            self.data = ags.get_cons_for_preconsolidation()
-            self.samples = self.data["SAMP_NAME"].unique()
-            self.cbx_samples.addItems(self.samples)
-        except FileExistsError:
-            print("File does not exist")
+        if not file_names:
+            return
+        self.statusBar().showMessage(f"Loading {len(file_names)} files ...")
+        self.load_runner.submit(
+            self.workspace.add_files, file_names, with_progress=True
+        )
+        return
+
+    def ags_loaded(self, failed):
+        self.update_samples()
+        message = (
+            f"{self.cbx_samples.count()} samples from "
+            f"{len(self.workspace.get_file_names())} files"
+        )
+        if failed:
+            message += f", could not read {', '.join(map(os.path.basename, failed))}"
+        self.statusBar().showMessage(message, 10000)
+        self.show_timings()
+        return
+
+    def btn_reset_handles_clicked(self):
+        if self.base_result is not None:
+            self.uncertainty_runner.cancel()
+            self.consol.reset_handles()
+        return
+
+    def create_plot(self):
+        # Swaps the placeholder for the plot's canvas and toolbar
+        import matplotlib as mpl
+
+        mpl.use("QtAgg")
+        from app_modules import Casagrande_PreConsolidation
+        from matplotlib.backends.backend_qtagg import (
+            NavigationToolbar2QT as NavigationToolbar,
+        )
+
+        self._consol = Casagrande_PreConsolidation()
+        self._consol.set_interactive()
+        self.canvas = self._consol.get_canvas()
+        self.toolbar = NavigationToolbar(self.canvas, self)
+        self.set_plot_navigation_bar()
+        self.plot_layout.removeWidget(self.plot_placeholder)
+        self.plot_placeholder.deleteLater()
+        self.plot_layout.addWidget(self.toolbar)
+        self.plot_layout.addWidget(self.canvas)
         return
 
     def cbx_samples_changed(self, i):
-        self.sample_data = self.data[self.data["SAMP_NAME"] == self.samples[i]]
-        self.sample_data = self.sample_data[["CONS_INCF", "CONS_INCE"]].reset_index(
-            drop=True
+        if i < 0:
+            return
+        self.create_table(*self.workspace.get_catalogue().get_sample(i))
+        return
+
+    def job_failed(self, message):
+        self.statusBar().showMessage(message)
+        return
+
+    def modules_preloaded(self, _):
+        if self._consol is None:
+            self.create_plot()
+        return
+
+    def plots_exported(self, failed):
+        message = f"Exported {self.cbx_samples.count() - len(failed)} plots"
+        if failed:
+            message += f", could not plot {', '.join(failed)}"
+        self.statusBar().showMessage(message, 10000)
+        return
+
+    def recompute_edited(self):
+        self.statusBar().showMessage("Computing ...")
+        self.compute_runner.submit(
+            self.consol.get_engine().update, self.base_result, *self.model.get_arrays()
         )
-        self.create_table()
+        return
+
+    def result_ready(self, result):
+        self.base_result = result
+        self.uncertainty_runner.cancel()  # It was for the previous result
+        self.consol.set_result(result)
+        self.toolbar.update()  # Home returns to the new sample's view
+        self.statusBar().clearMessage()
+        self.show_timings()
         return
 
     def set_plot_navigation_bar(self):
@@ -136,19 +473,56 @@ class MainWindow(QMainWindow):
                 self.toolbar.removeAction(action)
         return
 
-    def create_table(self):
-        self.model = PreconsolidationModel(self.sample_data)
-        self.model.signal.connect(self.set_plot)
+    def show_timings(self):
+        if profiler.is_enabled():
+            self.lbl_timings.setText(
+                " | ".join(
+                    f"{stage} {seconds * 1000:.1f} ms"
+                    for stage, seconds in profiler.get_timings().items()
+                )
+            )
+        return
+
+    def uncertainty_ready(self, uncertainty):
+        self.consol.show_uncertainty(uncertainty)
+        self.statusBar().showMessage(
+            f"{len(uncertainty.p)} realisations, {uncertainty.n_failed} without an intersection",
+            10000,
+        )
+        return
+
+    def update_samples(self):
+        # The catalogue only grows, so the selected sample keeps its position
+        current = self.cbx_samples.currentIndex()
+        self.cbx_samples.blockSignals(True)
+        self.cbx_samples.clear()
+        for i, label in enumerate(self.workspace.get_labels()):
+            self.cbx_samples.addItem(label)
+            self.cbx_samples.setItemData(
+                i, "\n".join(self.workspace.get_sources(i)), Qt.ToolTipRole
+            )
+        keep = 0 <= current < self.cbx_samples.count()
+        self.cbx_samples.setCurrentIndex(current if keep else -1)
+        self.cbx_samples.blockSignals(False)
+        if not keep and self.cbx_samples.count():
+            self.cbx_samples.setCurrentIndex(0)
+        return
+
+    def create_table(self, axial_loads_kpa, void_ratios):
+        self.edit_timer.stop()
+        self.model = PreconsolidationModel(axial_loads_kpa, void_ratios)
+        # Not connected to start directly: the (row, column) arguments would
+        # pick the start(msec) overload and set the interval to the row
+        self.model.signal.connect(lambda *_: self.edit_timer.start())
         self.table.setModel(self.model)
         self.set_plot()
         return
 
     def set_plot(self):
-        self.consol.set_data(
-            axial_loads_kpa=self.sample_data["CONS_INCF"].values,
-            void_ratios=self.sample_data["CONS_INCE"].values,
+        self.statusBar().showMessage("Computing ...")
+        self.compute_runner.submit(
+            self.consol.get_engine().compute, *self.model.get_arrays()
         )
-        self.consol.set_interactive()
         return
 
 
@@ -1,2 +1,22 @@
-from .preconsolidation_plot import Casagrande_PreConsolidation
-from .process_ags import ProcessAGS
+import importlib
+
+# Exports are imported on first use so that headless callers of the compute
+# engine do not pay for importing matplotlib.
+_EXPORTS = {
+    "CasagrandeEngine": ".casagrande",
+    "CasagrandeResult": ".casagrande",
+    "Casagrande_PreConsolidation": ".preconsolidation_plot",
+    "ParsedAGSCache": ".ags_cache",
+    "ProcessAGS": ".process_ags",
+    "SampleIndex": ".sample_index",
+    "Workspace": ".workspace",
+    "load_cons_for_preconsolidation": ".process_ags",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Guards the index's read-modify-write between threads. A module lock rather
+# than an attribute, so the cache can still be pickled for worker processes,
+# which only ever replace the index whole.
+_index_lock = threading.Lock()
+
+
+class ParsedAGSCache:
+
+    # The cache only saves parsing. Entries it cannot read are parsed again
+    # and entries it cannot write are skipped, with a warning.
+    CHUNK_SIZE = 1 << 20
+    FORMAT_VERSION = 1  # Part of every key, bump when the cached frame changes
+    INDEX_NAME = "index.json"
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        max_bytes: int = 512 * 1024**2,
+        enabled: bool | None = None,
+    ) -> None:
+        if directory is None:
+            directory = os.environ.get(
+                "PRECONSOL_GUI_CACHE_DIR", Path.home() / ".cache" / "preconsol_gui"
+            )
+        if enabled is None:
+            enabled = os.environ.get("PRECONSOL_GUI_CACHE", "1") != "0"
+        self._directory = Path(directory)
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        self._known_hashes = dict()
+        self._warned = False
+
+    def _content_hash(self, file_name: str, key: str) -> str:
+        if key in self._known_hashes:
+            return self._known_hashes[key]
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"v{self.FORMAT_VERSION}".encode())
+        with open(file_name, "rb") as f:
+            while chunk := f.read(self.CHUNK_SIZE):
+                digest.update(chunk)
+        self._known_hashes[key] = digest.hexdigest()
+        return self._known_hashes[key]
+
+    def _entry_path(self, content_hash: str) -> Path:
+        return self._directory / f"{content_hash}.npz"
+
+    def _evict(self) -> None:
+        # Entries may be removed by other threads or processes meanwhile
+        entries = list()
+        for path in self._directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        removed = set()
+        while entries and total > self._max_bytes:
+            _, size, oldest = entries.pop(0)
+            total -= size
+            oldest.unlink(missing_ok=True)
+            removed.add(oldest.stem)
+        if removed:
+            with _index_lock:
+                index = self._read_index()
+                self._write_index(
+                    {key: value for key, value in index.items() if value not in removed}
+                )
+        return
+
+    def _load(self, file_name: str) -> pd.DataFrame | None:
+        key = self._stat_key(file_name)
+        content_hash = self._read_index().get(key)
+        if content_hash is None:  # Unseen path or touched file, match by content
+            content_hash = self._content_hash(file_name, key)
+        entry = self._entry_path(content_hash)
+        try:
+            with np.load(entry, allow_pickle=False) as npz:
+                arrays = {str(column): npz[column] for column in npz["__columns__"]}
+        except (FileNotFoundError, KeyError, ValueError):  # Missing or truncated
+            return None
+        df = pd.DataFrame(
+            {
+                column: array.astype(object) if array.dtype.kind == "U" else array
+                for column, array in arrays.items()
+            }
+        )
+        try:
+            os.utime(entry)  # Most recently used entries are evicted last
+        except FileNotFoundError:
+            pass
+        self._update_index(key, content_hash)
+        return df
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._directory / self.INDEX_NAME, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def _stat_key(self, file_name: str) -> str:
+        path = Path(file_name).resolve()
+        stat = path.stat()
+        return f"{self.FORMAT_VERSION}|{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def _store(self, file_name: str, df: pd.DataFrame) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        key = self._stat_key(file_name)
+        content_hash = self._content_hash(file_name, key)
+        arrays = {
+            column: (
+                df[column].to_numpy(dtype=str)
+                if df[column].dtype == object
+                else df[column].to_numpy()
+            )
+            for column in df.columns
+        }
+        entry = self._entry_path(content_hash)
+        temp = entry.with_suffix(f".{self._temp_suffix()}")
+        try:
+            with open(temp, "wb") as f:
+                np.savez(f, __columns__=np.array(df.columns, dtype=str), **arrays)
+            os.replace(temp, entry)
+        finally:
+            temp.unlink(missing_ok=True)
+        self._update_index(key, content_hash)
+        self._evict()
+        return
+
+    @staticmethod
+    def _temp_suffix() -> str:
+        # Unique per writer, as files may be cached from several threads
+        return f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _update_index(self, key: str, content_hash: str) -> None:
+        with _index_lock:
+            index = self._read_index()
+            if index.get(key) != content_hash:
+                index[key] = content_hash
+                self._write_index(index)
+        return
+
+    def _warn(self, action: str, file_name: str, error: OSError) -> None:
+        # Once per cache, as every file would fail the same way
+        log = logger.debug if self._warned else logger.warning
+        log("Could not %s the parse cache for %s: %s", action, file_name, error)
+        self._warned = True
+        return
+
+    def _write_index(self, index: dict) -> None:
+        temp = self._directory / f"{self.INDEX_NAME}.{self._temp_suffix()}"
+        with open(temp, "w") as f:
+            json.dump(index, f)
+        os.replace(temp, self._directory / self.INDEX_NAME)
+        return
+
+    def clear(self) -> None:
+        for path in self._directory.glob("*.npz"):
+            path.unlink(missing_ok=True)
+        (self._directory / self.INDEX_NAME).unlink(missing_ok=True)
+        return
+
+    def get(self, file_name: str) -> pd.DataFrame | None:
+        if not self._enabled:
+            return None
+        try:
+            return self._load(file_name)
+        except OSError as error:
+            self._warn("read", file_name, error)
+            return None
+
+    def put(self, file_name: str, df: pd.DataFrame) -> None:
+        if not self._enabled:
+            return
+        try:
+            self._store(file_name, df)
+        except OSError as error:
+            self._warn("write", file_name, error)
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,82 @@
+import csv
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+GROUP_PREFIX = '"GROUP"'
+
+
+def _parse_line(line: str) -> list[str]:
+    return next(csv.reader([line], quotechar='"'), [])
+
+
+def _to_dataframe(
+    headings: list[str], columns: dict[str, list], dtypes: dict[str, str]
+) -> pd.DataFrame:
+    typed = dict()
+    for heading in headings[1:]:
+        values = columns[heading]
+        if heading in dtypes:
+            typed[heading] = np.asarray(
+                pd.to_numeric(values, errors="coerce"), dtype=dtypes[heading]
+            )
+        else:
+            typed[heading] = np.array(values, dtype=object)
+        columns[heading] = None  # Release the raw strings as each column is typed
+    return pd.DataFrame(typed)
+
+
+def read_ags_groups(
+    file_name: str,
+    groups: Iterable[str] = ("CONS",),
+    dtypes: dict[str, dict[str, str]] | None = None,
+    encoding: str = "utf-8-sig",
+) -> tuple[dict[str, pd.DataFrame], dict[str, list[str]]]:
+    # Scans the file once, only splitting the lines of the requested groups, and
+    # stops as soon as every requested group has been read. DATA rows are kept,
+    # UNIT and TYPE rows are not, so tables hold data only.
+    wanted = set(groups)
+    dtypes = dtypes or dict()
+    tables = dict()
+    table_headings = dict()
+
+    group = None
+    headings = None
+    columns = None
+
+    def finish_group() -> None:
+        if group is not None and headings is not None:
+            tables[group] = _to_dataframe(headings, columns, dtypes.get(group, {}))
+            table_headings[group] = headings
+        return
+
+    with open(file_name, "r", encoding=encoding, errors="replace") as f:
+        for line in f:
+            if group is not None:
+                if line.strip() and not line.startswith(GROUP_PREFIX):
+                    row = _parse_line(line)
+                    if row[0] == "HEADING":
+                        headings = row
+                        columns = {heading: list() for heading in headings[1:]}
+                    elif row[0] == "DATA" and headings is not None:
+                        for heading, value in zip(headings[1:], row[1:]):
+                            columns[heading].append(value)
+                    continue
+                finish_group()
+                wanted.discard(group)
+                group = None
+                if not wanted:
+                    break
+            if line.startswith(GROUP_PREFIX):
+                name = _parse_line(line)[1]
+                if name in wanted:
+                    group, headings, columns = name, None, None
+        else:
+            finish_group()
+
+    return tables, table_headings
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,161 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .ags_cache import ParsedAGSCache
+from .casagrande import CasagrandeEngine
+from .process_ags import load_cons_for_preconsolidation
+from .sample_index import SampleIndex
+from .workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = [
+    "FILE",
+    "SAMP_NAME",
+    "PRECONSOLIDATION_KPA",
+    "VOID_RATIO",
+    "KNEE_KPA",
+    "SLOPE",
+    "ERROR",
+]
+
+
+def _failed_row(file_name: str, sample: str | None, error: Exception) -> dict:
+    return {
+        "FILE": file_name,
+        "SAMP_NAME": sample,
+        "PRECONSOLIDATION_KPA": np.nan,
+        "VOID_RATIO": np.nan,
+        "KNEE_KPA": np.nan,
+        "SLOPE": np.nan,
+        "ERROR": f"{type(error).__name__}: {error}",
+    }
+
+
+def _log_failures(rows: list[dict]) -> None:
+    for row in rows:
+        if row["ERROR"]:
+            logger.warning(
+                "%s failed: %s",
+                " ".join(filter(None, [row["FILE"], row["SAMP_NAME"]])),
+                row["ERROR"],
+            )
+    return
+
+
+def _sample_rows(file_names: list[str], samples: list[str], results: list) -> list:
+    rows = list()
+    for file_name, sample, result in zip(file_names, samples, results):
+        if isinstance(result, Exception):
+            rows.append(_failed_row(file_name, sample, result))
+            continue
+        rows.append(
+            {
+                "FILE": file_name,
+                "SAMP_NAME": sample,
+                "PRECONSOLIDATION_KPA": result.p,
+                "VOID_RATIO": result.e,
+                "KNEE_KPA": result.knee_x,
+                "SLOPE": result.slope,
+                "ERROR": result.diagnostics.message,
+            }
+        )
+    return rows
+
+
+def collect_ags_files(paths: list[str], recursive: bool = False) -> list[Path]:
+    files = list()
+    for path in map(Path, paths):
+        if path.is_dir():
+            pattern = "**/*.ags" if recursive else "*.ags"
+            files.extend(sorted(p for p in path.glob(pattern) if p.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+def process_file(
+    file_name: str, streaming: bool = True, cache: ParsedAGSCache | None = None
+) -> list[dict]:
+    try:
+        df_cons = load_cons_for_preconsolidation(
+            file_name, cache=cache, streaming=streaming
+        )
+        if df_cons is None:
+            raise ValueError("File has no CONS group with the required headings")
+    except Exception as error:
+        return [_failed_row(file_name, None, error)]
+
+    engine = CasagrandeEngine(cache_capacity=0)
+    index = SampleIndex.from_frame(df_cons)
+    results = engine.compute_many(index.get_samples())
+    return _sample_rows([file_name] * len(index), index.get_names(), results)
+
+
+def run_batch(
+    files: list[Path],
+    max_workers: int | None = None,
+    streaming: bool = True,
+    cache: ParsedAGSCache | None = None,
+) -> pd.DataFrame:
+    rows = list()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_file, str(f), streaming, cache): f for f in files
+        }
+        for future in as_completed(futures):
+            try:
+                file_rows = future.result()
+            except Exception as error:  # Worker process died
+                file_rows = [_failed_row(str(futures[future]), None, error)]
+            _log_failures(file_rows)
+            rows.extend(file_rows)
+    df_results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    return df_results.sort_values(["FILE", "SAMP_NAME"]).reset_index(drop=True)
+
+
+def run_workspace_batch(
+    files: list[Path],
+    max_workers: int | None = None,
+    streaming: bool = True,
+    cache: ParsedAGSCache | None = None,
+    store: Path | None = None,
+) -> pd.DataFrame:
+    # Like run_batch, but a sample found in several files is computed once
+    # and its FILE lists every source. The files are added to the samples of
+    # a CONS store if one is given.
+    workspace = Workspace(
+        cache=cache, max_workers=max_workers, processes=True, streaming=streaming
+    )
+    if store is not None:
+        workspace.open_store(store)
+    failed = workspace.add_files(files)
+    rows = [_failed_row(file_name, None, error) for file_name, error in failed.items()]
+    catalogue = workspace.get_catalogue()
+    results = CasagrandeEngine(cache_capacity=0).compute_many(catalogue.get_samples())
+    rows.extend(
+        _sample_rows(
+            [";".join(workspace.get_sources(i)) for i in range(len(catalogue))],
+            catalogue.get_names(),
+            results,
+        )
+    )
+    _log_failures(rows)
+    df_results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    return df_results.sort_values(["FILE", "SAMP_NAME"]).reset_index(drop=True)
+
+
+def write_results(df_results: pd.DataFrame, output: str) -> None:
+    if Path(output).suffix.lower() == ".parquet":
+        df_results.to_parquet(output, index=False)  # Requires pyarrow or fastparquet
+    else:
+        df_results.to_csv(output, index=False)
+    return
+
+
+if __name__ == "__main__":
+    pass
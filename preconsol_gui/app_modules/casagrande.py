@@ -0,0 +1,450 @@
+from typing import NamedTuple
+
+import numpy as np
+from scipy.interpolate import UnivariateSpline
+
+from .construction import NoIntersectionError, line_intersection, steepest_segment
+from .knee import find_knee, find_knees, spline_max_curvature
+from .profiling import profiler
+from .result_cache import ResultCache
+from .segmentation import LoadBranches, segment_curve, segment_curves
+from .uncertainty import UncertaintyResult, monte_carlo
+
+
+class CasagrandeDiagnostics(NamedTuple):
+    n_points: int
+    n_ascending: int
+    n_after_knee: int
+    message: str = ""
+    stages: tuple = ()
+    n_cycles: int = 0
+
+
+class CasagrandeResult(NamedTuple):
+    axial_loads: np.ndarray
+    void_ratios: np.ndarray
+    knee_x: float
+    knee_y: float
+    spline: UnivariateSpline
+    spline_deriv: UnivariateSpline
+    straight_line_xs: np.ndarray
+    straight_line_ys: np.ndarray
+    slope: float
+    intercept: float
+    p: float
+    e: float
+    diagnostics: CasagrandeDiagnostics
+    # Every measured increment split into loading, unloading and reloading.
+    # axial_loads and void_ratios above are its virgin loading branch.
+    branches: LoadBranches | None = None
+
+    @property
+    def after_knee(self) -> np.ndarray:
+        return self.axial_loads > self.knee_x
+
+    @property
+    def knee_log10_x(self) -> float:
+        return np.log10(self.knee_x)
+
+    def bisector(self, xs) -> np.ndarray:
+        return np.array(
+            (np.log10(xs) - self.knee_log10_x)
+            * np.divide(self.spline_deriv(self.knee_log10_x), 2)
+            + self.spline(self.knee_log10_x)
+        )
+
+    def peak_curve(self, xs) -> np.ndarray:
+        return (np.log10(xs) - self.knee_log10_x) * self.spline_deriv(
+            self.knee_log10_x
+        ) + self.spline(self.knee_log10_x)
+
+    def straight_line(self, xs) -> np.ndarray:
+        return np.array(np.log10(xs) * self.slope + self.intercept)
+
+
+class CasagrandeEngine:
+
+    # kneedle picks a measured increment, max_curvature the point where the
+    # fitted spline bends most in log10 load space.
+    KNEE_METHODS = ("kneedle", "max_curvature")
+
+    def __init__(
+        self,
+        smoothing_degree: int = 2,
+        smoothing_factor: float | None = 0,
+        cache_capacity: int = 128,
+        knee_method: str = "kneedle",
+    ) -> None:
+        self._smoothing_degree = smoothing_degree
+        self._smoothing_factor = smoothing_factor
+        self.set_knee_method(knee_method)
+        self._result_cache = ResultCache(capacity=cache_capacity)
+
+    def _determine_peak_slope(
+        self, axial_loads: np.ndarray, void_ratios: np.ndarray, knee_x: float
+    ) -> tuple[np.ndarray, np.ndarray, float, float]:
+        mask: np.ndarray = axial_loads > knee_x
+        xs = axial_loads[mask]
+        ys = void_ratios[mask]
+        start, stop, m, c = steepest_segment(xs, ys)
+        return xs[start:stop], ys[start:stop], m, c
+
+    def _determine_slope(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        A = np.vstack([np.log10(xs), np.ones(len(xs))]).T
+        return np.linalg.lstsq(A, ys, rcond=None)[0]
+
+    def _knee_point(
+        self,
+        axial_loads: np.ndarray,
+        void_ratios: np.ndarray,
+        spline: UnivariateSpline,
+    ) -> tuple[float, float]:
+        if self._knee_method == "max_curvature":
+            return spline_max_curvature(spline)
+        knee_x, knee_y = find_knee(axial_loads, void_ratios)
+        if np.isnan(knee_x):
+            raise ValueError("No knee point found in the loading curve")
+        return knee_x, knee_y
+
+    def _preconsolidation(self, result: CasagrandeResult) -> CasagrandeResult:
+        knee_log10_x = result.knee_log10_x
+        bisector_slope = result.spline_deriv(knee_log10_x) / 2
+        try:
+            p, e = line_intersection(
+                result.slope,
+                result.intercept,
+                bisector_slope,
+                result.spline(knee_log10_x) - bisector_slope * knee_log10_x,
+                x_min=result.knee_x,
+                x_max=result.axial_loads[-1],
+            )
+            message = ""
+        except NoIntersectionError as error:
+            p, e, message = np.nan, np.nan, str(error)
+        return result._replace(
+            p=p, e=e, diagnostics=result.diagnostics._replace(message=message)
+        )
+
+    def _spline(
+        self, axial_loads: np.ndarray, void_ratios: np.ndarray
+    ) -> UnivariateSpline:
+        if len(axial_loads) <= self._smoothing_degree:
+            raise ValueError(
+                f"A degree {self._smoothing_degree} spline needs at least "
+                f"{self._smoothing_degree + 1} increasing loads"
+            )
+        return UnivariateSpline(
+            np.log10(axial_loads),
+            void_ratios,
+            s=self._smoothing_factor,
+            k=self._smoothing_degree,
+        )
+
+    def _cache_key(self, axial_loads_kpa: np.ndarray, void_ratios: np.ndarray) -> str:
+        return ResultCache.make_key(
+            axial_loads_kpa,
+            void_ratios,
+            smoothing_degree=self._smoothing_degree,
+            smoothing_factor=self._smoothing_factor,
+            knee_method=self._knee_method,
+        )
+
+    def _run_pipeline(
+        self,
+        axial_loads_kpa: np.ndarray,
+        void_ratios: np.ndarray,
+        previous: CasagrandeResult | None = None,
+        knee: tuple[float, float] | None = None,
+        branches: LoadBranches | None = None,
+    ) -> CasagrandeResult:
+        # Each stage reruns only when its own inputs differ from the previous
+        # result's: the knee and spline depend on every loading point, the
+        # straightest line only on the points after the knee. Branches
+        # already segmented, as by segment_curves, can be passed in.
+        axial_loads_kpa = np.asarray(axial_loads_kpa, dtype=float)
+        void_ratios = np.asarray(void_ratios, dtype=float)
+        if branches is None:
+            with profiler.stage("segmentation"):
+                branches = segment_curve(axial_loads_kpa, void_ratios)
+        asc_axial_loads = axial_loads_kpa[branches.virgin_loading]
+        asc_void_ratios = void_ratios[branches.virgin_loading]
+        for array in (asc_axial_loads, asc_void_ratios):
+            array.flags.writeable = False
+        stages = list()
+
+        same_curve = (
+            previous is not None
+            and np.array_equal(asc_axial_loads, previous.axial_loads)
+            and np.array_equal(asc_void_ratios, previous.void_ratios)
+        )
+        if same_curve:
+            knee_x, knee_y = previous.knee_x, previous.knee_y
+            spline, spline_deriv = previous.spline, previous.spline_deriv
+        else:
+            if knee is not None and np.isnan(knee[0]):
+                raise ValueError("No knee point found in the loading curve")
+            with profiler.stage("spline"):
+                spline = self._spline(asc_axial_loads, asc_void_ratios)
+                spline_deriv = spline.derivative()
+            if knee is None:
+                with profiler.stage("knee"):
+                    knee_x, knee_y = self._knee_point(
+                        asc_axial_loads, asc_void_ratios, spline
+                    )
+            else:
+                knee_x, knee_y = knee
+            stages.extend(["spline", "knee"])
+
+        after_knee = asc_axial_loads > knee_x
+        if (
+            previous is not None
+            and knee_x == previous.knee_x
+            and np.array_equal(
+                asc_axial_loads[after_knee], previous.axial_loads[previous.after_knee]
+            )
+            and np.array_equal(
+                asc_void_ratios[after_knee], previous.void_ratios[previous.after_knee]
+            )
+        ):
+            xs, ys = previous.straight_line_xs, previous.straight_line_ys
+            slope, intercept = previous.slope, previous.intercept
+        else:
+            with profiler.stage("straight_line"):
+                xs, ys, slope, intercept = self._determine_peak_slope(
+                    asc_axial_loads, asc_void_ratios, knee_x
+                )
+            stages.append("straight_line")
+
+        stages.append("intersection")
+        result = CasagrandeResult(
+            axial_loads=asc_axial_loads,
+            void_ratios=asc_void_ratios,
+            knee_x=knee_x,
+            knee_y=knee_y,
+            spline=spline,
+            spline_deriv=spline_deriv,
+            straight_line_xs=xs,
+            straight_line_ys=ys,
+            slope=slope,
+            intercept=intercept,
+            p=np.nan,
+            e=np.nan,
+            diagnostics=CasagrandeDiagnostics(
+                n_points=len(axial_loads_kpa),
+                n_ascending=len(asc_axial_loads),
+                n_after_knee=int(np.sum(after_knee)),
+                stages=tuple(stages),
+                n_cycles=branches.n_cycles,
+            ),
+            branches=branches,
+        )
+        with profiler.stage("intersection"):
+            result = self._preconsolidation(result)
+        return result
+
+    def clear_cache(self) -> None:
+        self._result_cache.clear()
+        return
+
+    def compute(
+        self, axial_loads_kpa: np.ndarray, void_ratios: np.ndarray
+    ) -> CasagrandeResult:
+        return self.update(None, axial_loads_kpa, void_ratios)
+
+    def compute_many(
+        self, curves: list[tuple[np.ndarray, np.ndarray]]
+    ) -> list[CasagrandeResult | Exception]:
+        # Segments every sample and finds every knee in one vectorised pass
+        # each, then runs the rest of the pipeline per sample. Failed samples
+        # hold their exception.
+        with profiler.stage("segmentation", n_samples=len(curves)):
+            all_branches = segment_curves(curves)
+        with profiler.stage("knee", n_samples=len(curves)):
+            knees_x, knees_y = find_knees(
+                [b.axial_loads[b.virgin_loading] for b in all_branches],
+                [b.void_ratios[b.virgin_loading] for b in all_branches],
+            )
+        results = list()
+        for branches, knee in zip(all_branches, zip(knees_x, knees_y)):
+            try:
+                results.append(
+                    self._run_pipeline(
+                        branches.axial_loads,
+                        branches.void_ratios,
+                        knee=knee,
+                        branches=branches,
+                    )
+                )
+            except Exception as error:
+                results.append(error)
+        return results
+
+    def get_cache_stats(self) -> dict:
+        return self._result_cache.get_stats()
+
+    def get_knee_method(self) -> str:
+        return self._knee_method
+
+    def reset_handles(self, result: CasagrandeResult) -> CasagrandeResult:
+        # Back to the computed knee and straightest line after handles have
+        # been dragged, reusing the result's spline.
+        knee_x, knee_y = self._knee_point(
+            result.axial_loads, result.void_ratios, result.spline
+        )
+        xs, ys, slope, intercept = self._determine_peak_slope(
+            result.axial_loads, result.void_ratios, knee_x
+        )
+        return self._preconsolidation(
+            result._replace(
+                knee_x=knee_x,
+                knee_y=knee_y,
+                straight_line_xs=xs,
+                straight_line_ys=ys,
+                slope=slope,
+                intercept=intercept,
+            )
+        )
+
+    def set_cache_capacity(self, capacity: int) -> None:
+        self._result_cache.set_capacity(capacity)
+        return
+
+    def set_knee_method(self, knee_method: str) -> None:
+        if knee_method not in self.KNEE_METHODS:
+            raise ValueError(
+                f"Unknown knee method {knee_method!r}, expected one of {self.KNEE_METHODS}"
+            )
+        self._knee_method = knee_method
+        return
+
+    def sweep(
+        self,
+        axial_loads_kpa: np.ndarray,
+        void_ratios: np.ndarray,
+        grid: list[tuple[int, float | None]],
+        knee: tuple[float, float] | None = None,
+        branches: LoadBranches | None = None,
+    ) -> dict[tuple[int, float | None], CasagrandeResult | Exception]:
+        # Computes the sample for every (smoothing_degree, smoothing_factor)
+        # pair. The segmentation and log10 loads are shared by the whole
+        # grid, a kneedle knee is found once as it comes from the measured
+        # points, and the straightest line search runs once per distinct set
+        # of points after the knee. A kneedle knee already found, as by
+        # find_knees, and branches already segmented can be passed in.
+        axial_loads_kpa = np.asarray(axial_loads_kpa, dtype=float)
+        void_ratios = np.asarray(void_ratios, dtype=float)
+        if branches is None:
+            branches = segment_curve(axial_loads_kpa, void_ratios)
+        asc_axial_loads = axial_loads_kpa[branches.virgin_loading]
+        asc_void_ratios = void_ratios[branches.virgin_loading]
+        for array in (asc_axial_loads, asc_void_ratios):
+            array.flags.writeable = False
+        log_loads = np.log10(asc_axial_loads)
+        try:
+            if knee is not None and np.isnan(knee[0]):
+                raise ValueError("No knee point found in the loading curve")
+            if knee is None and self._knee_method == "kneedle":
+                knee = self._knee_point(asc_axial_loads, asc_void_ratios, None)
+        except ValueError as error:
+            return {point: error for point in grid}
+        straight_lines = dict()  # Number of points after the knee to line
+        results = dict()
+        for smoothing_degree, smoothing_factor in grid:
+            try:
+                if len(asc_axial_loads) <= smoothing_degree:
+                    raise ValueError(
+                        f"A degree {smoothing_degree} spline needs at least "
+                        f"{smoothing_degree + 1} increasing loads"
+                    )
+                spline = UnivariateSpline(
+                    log_loads, asc_void_ratios, s=smoothing_factor, k=smoothing_degree
+                )
+                knee_x, knee_y = (
+                    knee if knee is not None else spline_max_curvature(spline)
+                )
+                after_knee = asc_axial_loads > knee_x
+                n_after_knee = int(np.sum(after_knee))
+                if n_after_knee not in straight_lines:
+                    straight_lines[n_after_knee] = self._determine_peak_slope(
+                        asc_axial_loads, asc_void_ratios, knee_x
+                    )
+                xs, ys, slope, intercept = straight_lines[n_after_knee]
+                results[smoothing_degree, smoothing_factor] = self._preconsolidation(
+                    CasagrandeResult(
+                        axial_loads=asc_axial_loads,
+                        void_ratios=asc_void_ratios,
+                        knee_x=knee_x,
+                        knee_y=knee_y,
+                        spline=spline,
+                        spline_deriv=spline.derivative(),
+                        straight_line_xs=xs,
+                        straight_line_ys=ys,
+                        slope=slope,
+                        intercept=intercept,
+                        p=np.nan,
+                        e=np.nan,
+                        diagnostics=CasagrandeDiagnostics(
+                            n_points=len(axial_loads_kpa),
+                            n_ascending=len(asc_axial_loads),
+                            n_after_knee=n_after_knee,
+                            n_cycles=branches.n_cycles,
+                        ),
+                        branches=branches,
+                    )
+                )
+            except Exception as error:
+                results[smoothing_degree, smoothing_factor] = error
+        return results
+
+    def uncertainty(self, result: CasagrandeResult, **options) -> UncertaintyResult:
+        # Spread of p from perturbing the result's curve and its handles as
+        # they stand, so dragged handles are respected. See monte_carlo for
+        # the options.
+        return monte_carlo(
+            result.axial_loads,
+            result.void_ratios,
+            result.knee_x,
+            result.straight_line_xs,
+            result.straight_line_ys,
+            smoothing_degree=self._smoothing_degree,
+            smoothing_factor=self._smoothing_factor,
+            **options,
+        )
+
+    def update(
+        self,
+        previous: CasagrandeResult | None,
+        axial_loads_kpa: np.ndarray,
+        void_ratios: np.ndarray,
+    ) -> CasagrandeResult:
+        key = self._cache_key(axial_loads_kpa, void_ratios)
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._run_pipeline(axial_loads_kpa, void_ratios, previous=previous)
+        self._result_cache.put(key, result)
+        return result
+
+    def with_knee(self, result: CasagrandeResult, knee_x: float) -> CasagrandeResult:
+        return self._preconsolidation(
+            result._replace(
+                knee_x=knee_x, knee_y=float(result.spline(np.log10(knee_x)))
+            )
+        )
+
+    def with_straight_line(
+        self, result: CasagrandeResult, xs: np.ndarray, ys: np.ndarray
+    ) -> CasagrandeResult:
+        slope, intercept = self._determine_slope(xs, ys)
+        return self._preconsolidation(
+            result._replace(
+                straight_line_xs=np.array(xs),
+                straight_line_ys=np.array(ys),
+                slope=slope,
+                intercept=intercept,
+            )
+        )
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .sample_index import SampleIndex
+
+STORE_SUFFIX = ".pcstore"
+STORE_VERSION = 1
+META_NAME = "meta.json"
+
+# A store is a directory of plain .npy files, one per typed column, opened
+# with mmap_mode="r". Only the pages of the samples actually read are loaded.
+INDEX_COLUMNS = (
+    "names",
+    "sample_ids",
+    "offsets",
+    "lengths",
+    "axial_loads_kpa",
+    "void_ratios",
+    "increments",
+)
+
+
+class StoreSources:
+
+    # Each sample's source file codes, read from the store on first access so
+    # opening a store does not build a list per sample. Samples appended
+    # after opening are held in memory.
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray) -> None:
+        self._codes = codes
+        self._offsets = offsets
+        self._n_stored = len(offsets) - 1
+        self._loaded = dict()
+        self._appended = list()
+
+    def __getitem__(self, sample: int) -> list[int]:
+        if sample >= self._n_stored:
+            return self._appended[sample - self._n_stored]
+        if sample not in self._loaded:
+            start, stop = self._offsets[sample], self._offsets[sample + 1]
+            self._loaded[sample] = self._codes[start:stop].tolist()
+        return self._loaded[sample]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self) -> int:
+        return self._n_stored + len(self._appended)
+
+    def append(self, codes: list[int]) -> None:
+        self._appended.append(codes)
+        return
+
+
+def is_cons_store(path: str | Path) -> bool:
+    return (Path(path) / META_NAME).is_file()
+
+
+def open_cons_store(
+    directory: str | Path,
+) -> tuple[SampleIndex, list[str], StoreSources]:
+    # Returns the index, the source file names and each sample's source codes
+    directory = Path(directory)
+    with open(directory / META_NAME, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != STORE_VERSION:
+        raise ValueError(f"Unsupported CONS store version {meta.get('version')}")
+    arrays = {
+        column: np.load(directory / f"{column}.npy", mmap_mode="r")
+        for column in INDEX_COLUMNS
+    }
+    sources = StoreSources(
+        np.load(directory / "source_codes.npy", mmap_mode="r"),
+        np.load(directory / "source_offsets.npy", mmap_mode="r"),
+    )
+    return SampleIndex(**arrays), meta["files"], sources
+
+
+def write_cons_store(
+    directory: str | Path,
+    index: SampleIndex,
+    file_names: list[str],
+    sources: list[list[int]] | StoreSources,
+) -> None:
+    # Raises ValueError rather than replace a directory that is not a store
+    directory = Path(directory)
+    if directory.exists() and not is_cons_store(directory):
+        raise ValueError(f"{directory} exists and is not a CONS store")
+    temp = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(temp, ignore_errors=True)
+    temp.mkdir(parents=True)
+    for column, array in index.get_arrays().items():
+        if array.dtype == object:
+            array = array.astype(str)
+        np.save(temp / f"{column}.npy", np.ascontiguousarray(array))
+    source_lengths = np.array([len(codes) for codes in sources], dtype=np.intp)
+    np.save(
+        temp / "source_codes.npy",
+        np.array([code for codes in sources for code in codes], dtype=np.int32),
+    )
+    np.save(
+        temp / "source_offsets.npy",
+        np.concatenate([[0], np.cumsum(source_lengths)]).astype(np.intp),
+    )
+    with open(temp / META_NAME, "w") as f:
+        json.dump(
+            {
+                "version": STORE_VERSION,
+                "files": list(file_names),
+                "n_samples": len(index),
+                "n_rows": int(np.sum(index.get_lengths())),
+            },
+            f,
+            indent=2,
+        )
+    if directory.exists():
+        shutil.rmtree(directory)
+    os.replace(temp, directory)
+    return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class NoIntersectionError(ValueError):
+    pass
+
+
+def _prefix_sums(array: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(array)))
+
+
+def line_intersection(
+    slope_a: float,
+    intercept_a: float,
+    slope_b: float,
+    intercept_b: float,
+    x_min: float | None = None,
+    x_max: float | None = None,
+) -> tuple[float, float]:
+    # Both lines are straight in log10(x), y = slope * log10(x) + intercept, so
+    # they meet at a single point unless parallel.
+    if abs(slope_a - slope_b) <= 1e-12:
+        raise NoIntersectionError("Lines are parallel and do not intersect")
+    log_x = (intercept_b - intercept_a) / (slope_a - slope_b)
+    x = 10**log_x
+    if x_min is not None and x < x_min:
+        raise NoIntersectionError(f"Lines intersect at {x:.3g}, below {x_min:.3g}")
+    if x_max is not None and x > x_max:
+        raise NoIntersectionError(f"Lines intersect at {x:.3g}, above {x_max:.3g}")
+    return float(x), float(slope_a * log_x + intercept_a)
+
+
+def steepest_segment(
+    xs: np.ndarray, ys: np.ndarray, rtol: float = 1e-9
+) -> tuple[int, int, float, float]:
+    # Fits ys against log10(xs) for every contiguous run of at least two points in
+    # one pass. The steepest least squares line through any subset of points is
+    # always found between two neighbouring points, so the runs cover the subsets
+    # the original combinations sweep tried. Ties resolve to the shortest then
+    # earliest run, matching the order that sweep visited them in.
+    log_xs = np.log10(np.asarray(xs, dtype=float))
+    ys = np.asarray(ys, dtype=float)
+    n = len(log_xs)
+    if n < 2:
+        raise ValueError(
+            "At least two points are required after the knee to fit a straight line"
+        )
+
+    log_x_mean = log_xs.mean()
+    centred_xs = log_xs - log_x_mean  # Limits cancellation in the sums of squares
+    sum_x = _prefix_sums(centred_xs)
+    sum_y = _prefix_sums(ys)
+    sum_xx = _prefix_sums(centred_xs * centred_xs)
+    sum_xy = _prefix_sums(centred_xs * ys)
+
+    starts, stops = np.triu_indices(n + 1, k=2)
+    counts = stops - starts
+    order = np.lexsort((starts, counts))
+    starts, stops, counts = starts[order], stops[order], counts[order]
+
+    s_x = sum_x[stops] - sum_x[starts]
+    s_y = sum_y[stops] - sum_y[starts]
+    s_xx = sum_xx[stops] - sum_xx[starts]
+    s_xy = sum_xy[stops] - sum_xy[starts]
+
+    slopes = (counts * s_xy - s_x * s_y) / (counts * s_xx - s_x * s_x)
+    magnitudes = np.abs(slopes)
+    best = int(np.argmax(magnitudes >= magnitudes.max() * (1 - rtol)))
+    slope = slopes[best]
+    intercept = (s_y[best] - slope * s_x[best]) / counts[best] - slope * log_x_mean
+    return int(starts[best]), int(stops[best]), float(slope), float(intercept)
+
+
+if __name__ == "__main__":
+    pass
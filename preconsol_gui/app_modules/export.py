@@ -0,0 +1,136 @@
+import multiprocessing
+import re
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from .preconsolidation_plot import Casagrande_PreConsolidation
+
+EXPORT_FORMATS = ("png", "svg", "pdf")
+SAMPLES_PER_TASK = 16
+
+_plot = None  # Each worker process draws every sample on one figure
+
+
+def _file_stems(names: list[str]) -> list[str]:
+    # Names made safe for file names, numbered where they clash
+    stems, seen = list(), dict()
+    for name in names:
+        stem = re.sub(r"[^\w.-]+", "_", str(name)).strip("._") or "sample"
+        seen[stem.lower()] = seen.get(stem.lower(), 0) + 1
+        stems.append(
+            stem if seen[stem.lower()] == 1 else f"{stem}_{seen[stem.lower()]}"
+        )
+    return stems
+
+
+def _get_plot() -> Casagrande_PreConsolidation:
+    global _plot
+    if _plot is None:
+        _plot = Casagrande_PreConsolidation(cache_capacity=0, headless=True)
+    return _plot
+
+
+def _render(
+    plot: Casagrande_PreConsolidation,
+    name: str,
+    axial_loads_kpa: np.ndarray,
+    void_ratios: np.ndarray,
+) -> None:
+    result = plot.get_engine().compute(axial_loads_kpa, void_ratios)
+    plot.set_result(result, reuse_artists=True)
+    plot.set_title(name)
+    return
+
+
+def _export_samples(
+    samples: list[tuple[str, str, np.ndarray, np.ndarray]],
+    directory: str,
+    formats: tuple[str, ...],
+    dpi: float,
+) -> dict[str, str]:
+    # Runs in a worker process. Returns the samples that failed.
+    plot = _get_plot()
+    failed = dict()
+    for name, stem, axial_loads_kpa, void_ratios in samples:
+        try:
+            _render(plot, name, axial_loads_kpa, void_ratios)
+            for format in formats:
+                plot.save_plot(str(Path(directory) / stem), format=format, dpi=dpi)
+        except Exception as error:
+            failed[name] = f"{type(error).__name__}: {error}"
+    return failed
+
+
+def export_pdf(
+    names: list[str],
+    samples: list[tuple[np.ndarray, np.ndarray]],
+    file_name: str | Path,
+    dpi: float = 100,
+    progress: Callable | None = None,
+) -> dict[str, str]:
+    # One page per sample. Pages go to a single file, so this runs in the
+    # calling process, still on one reused figure.
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    plot = Casagrande_PreConsolidation(cache_capacity=0, headless=True)
+    failed = dict()
+    with PdfPages(file_name) as pdf:
+        for done, (name, (axial_loads_kpa, void_ratios)) in enumerate(
+            zip(names, samples), start=1
+        ):
+            try:
+                _render(plot, name, axial_loads_kpa, void_ratios)
+                pdf.savefig(plot.get_figure(), dpi=dpi)
+            except Exception as error:
+                failed[name] = f"{type(error).__name__}: {error}"
+            if progress is not None:
+                progress(int(100 * done / len(samples)))
+    return failed
+
+
+def export_plots(
+    names: list[str],
+    samples: list[tuple[np.ndarray, np.ndarray]],
+    directory: str | Path,
+    formats: tuple[str, ...] = ("png",),
+    dpi: float = 100,
+    max_workers: int | None = None,
+    progress: Callable | None = None,
+) -> dict[str, str]:
+    # Writes one file per sample and format to directory, named after the
+    # sample. Returns the samples that failed and their errors. Workers are
+    # spawned rather than forked so they never inherit a running Qt app.
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Cannot export to {', '.join(sorted(unknown))}")
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    items = [
+        (name, stem, axial_loads_kpa, void_ratios)
+        for name, stem, (axial_loads_kpa, void_ratios) in zip(
+            names, _file_stems(names), samples
+        )
+    ]
+    chunks = [
+        items[start : start + SAMPLES_PER_TASK]
+        for start in range(0, len(items), SAMPLES_PER_TASK)
+    ]
+    failed = dict()
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(_export_samples, chunk, str(directory), tuple(formats), dpi)
+            for chunk in chunks
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            failed.update(future.result())
+            if progress is not None:
+                progress(int(100 * done / len(futures)))
+    return failed
+
+
+if __name__ == "__main__":
+    pass
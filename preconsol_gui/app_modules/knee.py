@@ -0,0 +1,175 @@
+import numpy as np
+from scipy.interpolate import PPoly, UnivariateSpline
+
+
+def _polyadd(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Column-wise polynomials, highest power first along axis 0
+    if len(a) < len(b):
+        a, b = b, a
+    out = a.copy()
+    out[len(a) - len(b) :] += b
+    return out
+
+
+def _polymul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    out = np.zeros((len(a) + len(b) - 1, a.shape[1]))
+    for i, row in enumerate(a):
+        out[i : i + len(b)] += row * b
+    return out
+
+
+def _polyval(c: np.ndarray, t: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(t)
+    for row in c:
+        out = out * t + row
+    return out
+
+
+def _segment_roots(c: np.ndarray, widths: np.ndarray) -> np.ndarray:
+    # Real roots of every column's polynomial within [0, width], NaN padded.
+    # Columns with a usable leading coefficient are solved together through
+    # the eigenvalues of their companion matrices.
+    scale = np.max(np.abs(c), axis=0)
+    while len(c) > 1 and np.all(np.abs(c[0]) <= 1e-12 * scale):
+        c = c[1:]
+    degree = len(c) - 1
+    roots = np.full((c.shape[1], max(degree, 1)), np.nan, dtype=complex)
+    if degree == 0:
+        return roots.real
+    regular = np.abs(c[0]) > 1e-12 * scale
+    companion = np.zeros((int(regular.sum()), degree, degree))
+    companion[:, 0, :] = -(c[1:, regular] / c[0, regular]).T
+    companion[:, np.arange(1, degree), np.arange(degree - 1)] = 1.0
+    roots[regular] = np.linalg.eigvals(companion)
+    for column in np.flatnonzero(~regular):
+        found = np.roots(c[:, column])
+        roots[column, : len(found)] = found
+    real = np.abs(roots.imag) <= 1e-9 * (1 + np.abs(roots.real))
+    inside = (roots.real >= 0) & (roots.real <= widths[:, None])
+    return np.where(real & inside, roots.real, np.nan)
+
+
+def spline_max_curvature(spline: UnivariateSpline) -> tuple[float, float]:
+    # The point where the spline, in log10 load space, bends down the most:
+    # the maximum of -y'' / (1 + y'^2)^1.5. Inside each polynomial piece the
+    # stationary points are the roots of y'''(1 + y'^2) - 3y'y''^2, so only
+    # those roots and the piece ends need evaluating.
+    pp = PPoly.from_spline(spline._eval_args)
+    if pp.c.shape[0] < 3:
+        raise ValueError("Curvature needs a spline of degree 2 or more")
+    widths = np.diff(pp.x)
+    pieces = widths > 0
+    widths, starts = widths[pieces], pp.x[:-1][pieces]
+    d1 = pp.derivative(1).c[:, pieces]
+    d2 = pp.derivative(2).c[:, pieces]
+    d3 = (
+        pp.derivative(3).c[:, pieces]
+        if pp.c.shape[0] > 3
+        else np.zeros((1, len(widths)))
+    )
+    stationary = _polyadd(
+        _polymul(d3, _polyadd(np.ones((1, len(widths))), _polymul(d1, d1))),
+        -3 * _polymul(d1, _polymul(d2, d2)),
+    )
+    candidates = np.column_stack(
+        [np.zeros(len(widths)), widths, _segment_roots(stationary, widths)]
+    ).T
+    with np.errstate(invalid="ignore"):
+        curvature = (
+            -_polyval(d2, candidates) / (1 + _polyval(d1, candidates) ** 2) ** 1.5
+        )
+    curvature = np.where(np.isnan(candidates), -np.inf, curvature)
+    row, column = np.unravel_index(np.argmax(curvature), curvature.shape)
+    if not curvature[row, column] > 0:
+        raise ValueError("The fitted spline has no downward bend")
+    log10_x = starts[column] + candidates[row, column]
+    return float(10**log10_x), float(spline(log10_x))
+
+
+def pad_curves(curves: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    lengths = np.array([len(curve) for curve in curves], dtype=np.intp)
+    padded = np.full((len(curves), max(lengths, default=0)), np.nan)
+    if len(curves):  # Filled row by row, as the curves are concatenated
+        padded[np.arange(padded.shape[1]) < lengths[:, None]] = np.concatenate(curves)
+    return padded, lengths
+
+
+def find_knees(
+    xs: np.ndarray | list[np.ndarray],
+    ys: np.ndarray | list[np.ndarray],
+    lengths: np.ndarray | None = None,
+    sensitivity: float = 1.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Kneedle for concave, decreasing curves, matching
+    # kneed.KneeLocator(x, y, S, curve="concave", direction="decreasing") for
+    # increasing x. Each row is one curve: either a ragged list of arrays or a
+    # padded 2-D array with the valid length of every row. Rows without a
+    # knee return NaN.
+    if lengths is None:
+        xs, lengths = pad_curves(xs)
+        ys, _ = pad_curves(ys)
+    xs = np.atleast_2d(np.asarray(xs, dtype=float))
+    ys = np.atleast_2d(np.asarray(ys, dtype=float))
+    lengths = np.asarray(lengths, dtype=np.intp)
+    n_rows, width = xs.shape
+    if width == 0:
+        return np.full(n_rows, np.nan), np.full(n_rows, np.nan)
+    columns = np.arange(width)
+    valid = columns < lengths[:, None]
+    last = np.maximum(lengths - 1, 0)[:, None]
+    rows = np.arange(n_rows)[:, None]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_min = np.min(xs, axis=1, where=valid, initial=np.inf)[:, None]
+        x_max = np.max(xs, axis=1, where=valid, initial=-np.inf)[:, None]
+        y_min = np.min(ys, axis=1, where=valid, initial=np.inf)[:, None]
+        y_max = np.max(ys, axis=1, where=valid, initial=-np.inf)[:, None]
+        x_normalized = (xs - x_min) / (x_max - x_min)
+        y_normalized = (ys - y_min) / (y_max - y_min)
+        # kneed flips the normalised y of a decreasing concave curve in place
+        flipped = np.clip(last - columns, 0, width - 1)
+        difference = y_normalized[rows, flipped] - x_normalized
+        difference[~valid] = np.nan
+
+        # Local extrema with neighbours clipped at each row's own ends, as in
+        # scipy.signal.argrelextrema(mode="clip")
+        previous = difference[rows, np.clip(columns - 1, 0, last)]
+        following = difference[rows, np.clip(columns + 1, 0, last)]
+        maxima = (difference >= previous) & (difference >= following) & valid
+        minima = (difference <= previous) & (difference <= following) & valid
+        step = sensitivity / np.maximum(lengths - 1, 1)[:, None]
+
+        # The detection state at each point is set by the latest extremum at
+        # or before it: a maximum arms a threshold, a minimum disarms it.
+        events = np.where(maxima | minima, columns, -1)
+        latest = np.maximum.accumulate(events, axis=1)
+        has_event = latest >= 0
+        latest = np.maximum(latest, 0)
+        armed = has_event & maxima[rows, latest] & ~minima[rows, latest]
+        threshold = difference[rows, latest] - step
+        drops = armed & (following < threshold) & (columns < last)
+
+    found = drops.any(axis=1) & (lengths > 1)
+    first = np.argmax(drops, axis=1)
+    knee_index = np.where(found, last[:, 0] - latest[np.arange(n_rows), first], 0)
+    knee_x = np.where(found, xs[np.arange(n_rows), knee_index], np.nan)
+    # Like kneed, the knee y is the first y recorded at the knee's x
+    first_match = np.argmax((xs == knee_x[:, None]) & valid, axis=1)
+    knee_y = np.where(found, ys[np.arange(n_rows), first_match], np.nan)
+    return knee_x, knee_y
+
+
+def find_knee(
+    x: np.ndarray, y: np.ndarray, sensitivity: float = 1.0
+) -> tuple[float, float]:
+    knee_x, knee_y = find_knees(
+        np.asarray(x, dtype=float)[None, :],
+        np.asarray(y, dtype=float)[None, :],
+        lengths=np.array([len(x)]),
+        sensitivity=sensitivity,
+    )
+    return float(knee_x[0]), float(knee_y[0])
+
+
+if __name__ == "__main__":
+    pass
@@ -1,71 +1,84 @@
-from itertools import combinations
+import time
+from collections import OrderedDict
 
 import matplotlib as mpl
 import numpy as np
-from kneed import KneeLocator
 from matplotlib.backend_bases import FigureCanvasBase, MouseButton
 from matplotlib.figure import Figure
 from matplotlib.ticker import ScalarFormatter
-from scipy.interpolate import UnivariateSpline
+from matplotlib.transforms import blended_transform_factory
+
+from .casagrande import CasagrandeEngine, CasagrandeResult
+from .profiling import profiler
+from .uncertainty import UncertaintyResult
 
 
 class Casagrande_PreConsolidation:
 
-    LINSPACE_RANGE = 10_000
+    CURVE_COARSE_STEPS = 64  # Cells the spline's bending is measured over
+    CURVE_MIN_SAMPLES = 64
+    CURVE_PIXELS_PER_SAMPLE = 2
+    CURVE_SAMPLING = ("adaptive", "linear")
+    DRAG_FRAME_INTERVAL = 1 / 60
+    LINSPACE_RANGE = 10_000  # Points of the linear curve sampling
     PLOT_Y_PADDING = 0.2
-
-    def __init__(self, figsize: tuple = (12, 8)) -> None:
+    PLOT_Y_STEP = 0.1  # Round limits let samples share a cached background
+    SWITCH_BACKGROUNDS = 8
+    UNCERTAINTY_BINS = 40
+    UNCERTAINTY_HEIGHT = 0.2  # Tallest histogram bar as a fraction of the axes
+
+    def __init__(
+        self,
+        figsize: tuple = (12, 8),
+        smoothing_degree: int = 2,
+        smoothing_factor: float | None = 0,
+        cache_capacity: int = 128,
+        headless: bool = False,
+        curve_sampling: str = "adaptive",
+    ) -> None:
+        if curve_sampling not in self.CURVE_SAMPLING:
+            raise ValueError(f"Unknown curve sampling {curve_sampling!r}")
+        self._engine = CasagrandeEngine(
+            smoothing_degree=smoothing_degree,
+            smoothing_factor=smoothing_factor,
+            cache_capacity=cache_capacity,
+        )
         self._figure = Figure(figsize=figsize)
         self._ax = self._figure.subplots(1, 1)
-        if mpl.rcParams["backend"] == "QtAgg":
+        if mpl.rcParams["backend"] == "QtAgg" and not headless:
             from matplotlib.backends.backend_qtagg import (
                 FigureCanvasQTAgg as FigureCanvas,
             )
-
-            self._canvas = FigureCanvas(self._figure)
-
-    def _ascending_values(self, array: np.ndarray, return_index: bool = False) -> tuple:
-        values = list()
-        indices = list()
-        for i, value in enumerate(array):
-            if i == 0 or value > values[-1]:
-                values.append(value)
-                indices.append(True)
-                continue
-            indices.append(False)
-        return np.array(values), np.array(indices) if return_index else np.array(values)
-
-    def _bisector_function(self, xs) -> np.ndarray:
-        return np.array(
-            (np.log10(xs) - self._knee_log10_x)
-            * np.divide(self._spline_deriv(self._knee_log10_x), 2)
-            + self._spline(self._knee_log10_x)
-        )
-
-    def _calculate_preconsolidation(
-        self, smoothing_degree: int = 2, smoothing_factor: float | None = 0
-    ) -> None:
-        self._set_spline(
-            smoothing_degree=smoothing_degree, smoothing_factor=smoothing_factor
-        )
-        a = self._bisector_function(self._after_knee_linspace)
-        b = self._straight_line_function(self._after_knee_linspace)
-        for exponent in range(-8, 3):
-            solution = np.isclose(
-                a, b, rtol=1 * 10**exponent
-            )  # Allows for ensuring a solution if found rather than using for example a fixed RTOL of 0.0001
-            if len(self._after_knee_linspace[solution]) > 0:
-                self._p = self._after_knee_linspace[solution][0]
-                self._e = a[solution][0]
-                break
+        else:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+
+        self._canvas = FigureCanvas(self._figure)
+        self._canvas.mpl_connect("resize_event", self._update_spline_curve)
+        self._curve_key = None  # What the drawn curve was sampled for
+        self._curve_sampling = curve_sampling
+        self._headless = headless
+        self._picker = None
+        self._switch_backgrounds = OrderedDict()  # Limits and size to pixels
+        self._uncertainty = None
+        self._uncertainty_artists = list()
+
+    def _clear_uncertainty(self) -> None:
+        for artist in self._uncertainty_artists:
+            artist.remove()
+        self._uncertainty = None
+        self._uncertainty_artists = list()
         return
 
     def _click_handle(self, event) -> None:
+        # Moving a handle changes the construction the spread was taken from
+        if self._uncertainty is not None:
+            self._clear_uncertainty()
+            self._update_preconsolidation_point()
         if event.artist is self._peak_curvature_handle:
             self._draggable_upper_limit = np.min(
                 self._straightest_line_handles.get_offsets().T[0]
             )
-            self._draggable_lower_limit = self._asc_axial_loads[0]
+            self._draggable_lower_limit = self._result.axial_loads[0]
             self._limit_span = self._ax.axvspan(
                 self._draggable_upper_limit,
                 np.max(self._ax.get_xlim()),
@@ -75,7 +88,7 @@ class Casagrande_PreConsolidation:
                 label="span",
             )
         elif event.artist is self._straightest_line_handles:
-            self._draggable_upper_limit = self._asc_axial_loads[-1]
+            self._draggable_upper_limit = self._result.axial_loads[-1]
             self._draggable_lower_limit = self._peak_curvature_handle.get_offsets()[
                 0, 0
             ]
@@ -98,32 +111,98 @@ class Casagrande_PreConsolidation:
         self._releaser = self._canvas.mpl_connect(
             "button_release_event", self._release_onclick
         )
+        self._start_blitting()
+        return
+
+    def _animated_artists(self) -> list:
+        return [
+            self._straightest_line,
+            self._horizontal_line,
+            self._peak_curvature_line,
+            self._bisector_line,
+            self._straightest_line_handles,
+            self._peak_curvature_handle,
+            self._preconsolidation_point,
+            self._preconsolidation_annotation,
+        ]
+
+    def _capture_background(self, event) -> None:
+        # Every full redraw while dragging (first frame, resize) renders the
+        # static artists only, so it is saved and reused for each drag frame.
+        self._background = self._canvas.copy_from_bbox(self._figure.bbox)
+        self._draw_animated()
         return
 
-    def _determine_peak_slope(self) -> None:
-        self._straight_line_xs = None
-        self._straight_line_ys = None
-        self._straight_line_slope = None
-        self._straight_line_intercept = None
-        mask: np.ndarray = self._asc_axial_loads > self._knee_x
-        d = dict(zip(self._asc_axial_loads[mask], self._asc_void_ratios[mask]))
-        for i in range(2, len(self._asc_axial_loads[mask]) + 1):
-            for combin in combinations(self._asc_axial_loads[mask], i):
-                temp_xs = np.fromiter(combin, dtype=float)
-                temp_ys = np.fromiter((d[x] for x in temp_xs), dtype=float)
-                m, c = self._determine_slope(temp_xs, temp_ys)
-                if (self._straight_line_slope == None) or (
-                    np.abs(m) > np.abs(self._straight_line_slope)
-                ):
-                    self._straight_line_xs = temp_xs
-                    self._straight_line_ys = temp_ys
-                    self._straight_line_slope = m
-                    self._straight_line_intercept = c
+    def _curve_samples(self) -> np.ndarray:
+        # Loads the spline curve is drawn at. "linear" spaces LINSPACE_RANGE
+        # points evenly in load over the whole curve. "adaptive" covers only
+        # the visible part, evenly in log load with one point for every
+        # CURVE_PIXELS_PER_SAMPLE pixels, then moves points to where the
+        # spline bends, at a density growing with the root of the curvature
+        # in pixels, which evens out the chord error of the drawn polyline.
+        low, high = self._result.axial_loads[0], self._result.axial_loads[-1]
+        if self._curve_sampling == "linear":
+            return np.linspace(low, high, self.LINSPACE_RANGE)
+        view_low, view_high = np.log10(self._ax.get_xlim())
+        u_low, u_high = max(np.log10(low), view_low), min(np.log10(high), view_high)
+        if not u_low < u_high:
+            return np.empty(0)
+        pixels_per_u = self._ax.bbox.width / (view_high - view_low)
+        n_samples = max(
+            self.CURVE_MIN_SAMPLES,
+            int((u_high - u_low) * pixels_per_u / self.CURVE_PIXELS_PER_SAMPLE),
+        )
+        knots, _, degree = self._result.spline._eval_args
+        if degree < 2:  # Straight between knots, which are added below
+            us = np.linspace(u_low, u_high, n_samples)
+        else:
+            edges = np.linspace(u_low, u_high, self.CURVE_COARSE_STEPS + 1)
+            y_low, y_high = self._ax.get_ylim()
+            curvature = np.abs(
+                self._result.spline((edges[:-1] + edges[1:]) / 2, nu=2)
+                * (self._ax.bbox.height / abs(y_high - y_low))
+                / pixels_per_u**2
+            )
+            density = np.concatenate([[0], np.cumsum(1 + np.sqrt(curvature))])
+            us = np.interp(np.linspace(0, density[-1], n_samples), density, edges)
+        us = np.union1d(us, knots[(knots > u_low) & (knots < u_high)])
+        return 10**us
+
+    def _draw_animated(self) -> None:
+        for artist in sorted(self._animated_artists(), key=lambda a: a.get_zorder()):
+            self._ax.draw_artist(artist)
         return
 
-    def _determine_slope(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
-        A = np.vstack([np.log10(xs), np.ones(len(xs))]).T
-        return np.linalg.lstsq(A, ys, rcond=None)[0]
+    def _draw_switch(self) -> None:
+        # The static parts of the plot (axes, ticks, grid) are cached for the
+        # last few limits and canvas sizes, so switching to a sample with
+        # cached limits repaints only the data artists over the cached copy.
+        # The data artists are all inside the axes, so only the axes are
+        # repainted, unless the ticks around them were drawn again.
+        if self._headless:
+            return
+        key = (self._ax.get_xlim(), self._ax.get_ylim(), self._figure.bbox.bounds)
+        artists = self._data_artists()
+        changed = self._ax.bbox
+        if key in self._switch_backgrounds:
+            self._switch_backgrounds.move_to_end(key)
+            self._canvas.restore_region(self._switch_backgrounds[key])
+        else:
+            changed = self._figure.bbox
+            for artist in artists:
+                artist.set_visible(False)
+            self._canvas.draw()
+            self._switch_backgrounds[key] = self._canvas.copy_from_bbox(
+                self._figure.bbox
+            )
+            if len(self._switch_backgrounds) > self.SWITCH_BACKGROUNDS:
+                self._switch_backgrounds.popitem(last=False)
+            for artist in artists:
+                artist.set_visible(True)
+        for artist in sorted(artists, key=lambda a: a.get_zorder()):
+            self._ax.draw_artist(artist)
+        self._canvas.blit(changed)
+        return
 
     def _find_nearest(self, array, value) -> np.ndarray:
         array = np.asarray(array)
@@ -136,126 +215,199 @@ class Casagrande_PreConsolidation:
             and event.xdata < self._draggable_upper_limit
         ):
             self._update_offset(event)
+            elapsed = time.perf_counter() - self._last_frame_time
+            if elapsed >= self.DRAG_FRAME_INTERVAL:
+                self._render_drag_frame()
+            elif not self._frame_pending:  # Catch up once the frame interval ends
+                self._frame_pending = True
+                self._frame_timer.start()
+        return
+
+    def _cycle_path(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # The unloading and reloading increments with the virgin loading
+        # increments either side of each cycle, NaN between cycles, and the
+        # positions of the unloading and reloading increments in the path
+        branches = self._result.branches
+        if branches is None or branches.n_cycles == 0:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=np.intp)
+        cycling = ~branches.virgin_loading
+        near = cycling.copy()
+        near[:-1] |= cycling[1:]
+        near[1:] |= cycling[:-1]
+        index = np.flatnonzero(near)
+        breaks = np.flatnonzero(np.diff(index) > 1) + 1
+        positions = np.arange(len(index)) + np.searchsorted(
+            breaks, np.arange(len(index)), side="right"
+        )
+        return (
+            np.insert(branches.axial_loads[index], breaks, np.nan),
+            np.insert(branches.void_ratios[index], breaks, np.nan),
+            positions[cycling[index]],
+        )
+
+    def _data_artists(self) -> list:
+        return [
+            self._spline_curve,
+            self._cycles_line,
+            self._p_e_markers,
+            *self._animated_artists(),
+        ]
+
+    def _draw(self) -> None:
+        if self._headless:  # Rendered when saved
+            return
+        if profiler.is_enabled():
+            self._canvas.draw()  # Render now so the draw stage is fully timed
+        else:
+            self._canvas.draw_idle()
         return
 
     def _initial_draw_plot(self) -> None:
         self._ax.cla()
-        self._x_limits = self._set_x_limits()
-        self._ax.set_ylim(
-            np.min(self._asc_void_ratios) * (1 - self.PLOT_Y_PADDING),
-            np.max(self._asc_void_ratios) * (1 + self.PLOT_Y_PADDING),
-        )
+        self._curve_key = None
+        self._switch_backgrounds.clear()
+        self._uncertainty = None
+        self._uncertainty_artists = list()
+        self._set_limits()
         self._ax.set_ylabel("Voids Ratio")
-        self._ax.set_xlim(self._x_limits)
         self._ax.set_xlabel("Axial Load  [kPa]")
         self._ax.set_xscale("log")
         self._ax.xaxis.set_major_formatter(ScalarFormatter())
         self._ax.xaxis.grid(visible=True, which="major", color="black", linestyle="-")
         self._ax.xaxis.grid(visible=True, which="minor", color="grey", linestyle="--")
 
-        self._determine_peak_slope()
-        self._calculate_preconsolidation()
-
         (self._spline_curve,) = self._ax.plot(
-            self._full_range_linspace,
-            self._spline(np.log10(self._full_range_linspace)),
+            [],
+            [],
             color="blue",
             label="spline_curve",
         )
+        self._update_spline_curve()
+        # The curve is sampled for the visible range, so zooming and panning
+        # sample it again
+        self._ax.callbacks.connect("xlim_changed", self._update_spline_curve)
         (self._straightest_line,) = self._ax.plot(
-            [self._asc_axial_loads[0], self._asc_axial_loads[-1]],
+            [self._result.axial_loads[0], self._result.axial_loads[-1]],
             [
-                self._straight_line_function(self._asc_axial_loads[0]),
-                self._straight_line_function(self._asc_axial_loads[-1]),
+                self._result.straight_line(self._result.axial_loads[0]),
+                self._result.straight_line(self._result.axial_loads[-1]),
             ],
             color="red",
             linestyle="--",
             label="straightest_line",
         )
         (self._horizontal_line,) = self._ax.plot(
-            [self._knee_x, np.max(self._asc_axial_loads[-1])],
+            [self._result.knee_x, np.max(self._result.axial_loads[-1])],
             [
-                self._knee_y,
+                self._result.knee_y,
             ]
             * 2,
             color="red",
             label="horizontal_line",
         )
         (self._peak_curvature_line,) = self._ax.plot(
-            [self._asc_axial_loads[0], self._asc_axial_loads[-1]],
+            [self._result.axial_loads[0], self._result.axial_loads[-1]],
             [
-                self._peak_curve_function(self._asc_axial_loads[0]),
-                self._peak_curve_function(self._asc_axial_loads[-1]),
+                self._result.peak_curve(self._result.axial_loads[0]),
+                self._result.peak_curve(self._result.axial_loads[-1]),
             ],
             color="red",
             label="peak_curvature_line",
         )
         (self._bisector_line,) = self._ax.plot(
-            [self._knee_x, self._asc_axial_loads[-1]],
+            [self._result.knee_x, self._result.axial_loads[-1]],
             [
-                self._bisector_function(self._knee_x),
-                self._bisector_function(self._asc_axial_loads[-1]),
+                self._result.bisector(self._result.knee_x),
+                self._result.bisector(self._result.axial_loads[-1]),
             ],
             color="red",
             linestyle="--",
             label="bisector_line",
         )
-        self._p_e_scatter = self._ax.scatter(
-            self._asc_axial_loads,
-            self._asc_void_ratios,
+        (self._cycles_line,) = self._ax.plot(
+            [],
+            [],
+            color="grey",
+            linestyle=":",
+            marker="o",
+            markerfacecolor="white",
+            label="load_cycles",
+        )
+        self._update_cycles_line()
+        # Points that are not picked are markers on a line rather than
+        # scatter collections, which take several times longer to draw
+        (self._p_e_markers,) = self._ax.plot(
+            self._result.axial_loads,
+            self._result.void_ratios,
             color="blue",
+            linestyle="none",
+            marker="o",
+            zorder=1,
         )
         self._straightest_line_handles = self._ax.scatter(
-            self._straight_line_xs,
-            self._straight_line_ys,
+            self._result.straight_line_xs,
+            self._result.straight_line_ys,
             color="red",
             zorder=2.5,
             picker=True,
         )
         self._peak_curvature_handle = self._ax.scatter(
-            self._knee_x,
-            self._knee_y,
+            self._result.knee_x,
+            self._result.knee_y,
             color="red",
             zorder=2.5,
             picker=True,
         )
-        self._preconsolidation_point = self._ax.scatter(
-            self._p,
-            self._e,
+        (self._preconsolidation_point,) = self._ax.plot(
+            self._result.p,
+            self._result.e,
             color="black",
+            linestyle="none",
+            marker="o",
             zorder=2.5,
         )
-        self._preconsolidation_annotation = self._ax.annotate(
-            f"Preconsolidation Pressure: {self._p:.0f}kPa",
-            xy=(0.97, 0.95),
-            xycoords="axes fraction",
+        # A text in axes coordinates rather than an annotation, which does the
+        # same with more work on every draw
+        self._preconsolidation_annotation = self._ax.text(
+            0.97,
+            0.95,
+            self._preconsolidation_text(),
+            transform=self._ax.transAxes,
             va="center",
             ha="right",
             zorder=5,
             bbox=dict(boxstyle="square", fc="w", pad=0.6),
         )
-        self._canvas.draw_idle()
+        self._draw()
         return
 
-    def _peak_curve_function(self, xs) -> float:
-        return (np.log10(xs) - self._knee_log10_x) * self._spline_deriv(
-            self._knee_log10_x
-        ) + self._spline(self._knee_log10_x)
+    def _preconsolidation_text(self) -> str:
+        if np.isnan(self._result.p):
+            text = "Preconsolidation Pressure: no intersection"
+        else:
+            text = f"Preconsolidation Pressure: {self._result.p:.0f}kPa"
+        if self._uncertainty is not None:
+            low, high = self._uncertainty.interval()
+            q_low, q_high = (
+                self._uncertainty.percentiles[0],
+                self._uncertainty.percentiles[-1],
+            )
+            text += (
+                f"\n{q_low:g}th to {q_high:g}th percentile: {low:.0f} to {high:.0f}kPa"
+            )
+        return text
 
-    def _recalculate_parameters(self, event) -> None:
+    def _recalculate_parameters(self) -> None:
         if self._current_artist is self._peak_curvature_handle:
-            self._knee_x, self._knee_y = (
-                event.xdata,
-                self._spline(np.log10(event.xdata)),
+            self._result = self._engine.with_knee(
+                self._result, self._current_offsets[0, 0]
             )
-            self._knee_log10_x = np.log10(self._knee_x)
         elif self._current_artist is self._straightest_line_handles:
             temp_xs, temp_ys = self._current_offsets.T
-            (
-                self._straight_line_slope,
-                self._straight_line_intercept,
-            ) = self._determine_slope(temp_xs, temp_ys)
-            # self._peak_gradient = self._determine_peak_slope()
+            self._result = self._engine.with_straight_line(
+                self._result, temp_xs, temp_ys
+            )
+        self._update_lines()
         self._update_preconsolidation_point()
         return
 
@@ -263,141 +415,286 @@ class Casagrande_PreConsolidation:
         if event.button == MouseButton.LEFT:
             self._canvas.mpl_disconnect(self._releaser)
             self._canvas.mpl_disconnect(self._follower)
+            self._stop_blitting()
             self._limit_span.remove()
-            self._recalculate_parameters(event)
-            self._update_offset(event)
-            self._update_lines()
+            self._recalculate_parameters()
+            self._canvas.draw_idle()
         return
 
-    def _set_knee_point(self) -> None:
-        kneed = KneeLocator(
-            self._asc_axial_loads,
-            self._asc_void_ratios,
-            S=1.0,
-            curve="concave",
-            direction="decreasing",
+    def _render_drag_frame(self) -> None:
+        self._frame_pending = False
+        self._last_frame_time = time.perf_counter()
+        self._recalculate_parameters()
+        self._canvas.restore_region(self._background)
+        self._draw_animated()
+        self._canvas.blit(self._figure.bbox)
+        return
+
+    def _set_limits(self) -> None:
+        # Wide enough for the unloading and reloading increments too, except
+        # unloading to zero, which a log axis cannot show
+        loads, voids = self._result.axial_loads, self._result.void_ratios
+        if self._result.branches is not None:
+            shown = self._result.branches.axial_loads > 0
+            loads = self._result.branches.axial_loads[shown]
+            voids = self._result.branches.void_ratios[shown]
+        self._x_limits = (
+            10 ** np.floor(np.log10(np.nanmin(loads))),
+            10 ** np.ceil(np.log10(np.nanmax(loads))),
         )
-        self._knee_x = kneed.knee
-        self._knee_y = kneed.knee_y
-        self._knee_log10_x = np.log10(self._knee_x)
-        self._after_knee_linspace = np.linspace(
-            self._knee_x, self._asc_axial_loads[-1], self.LINSPACE_RANGE
+        # Not emitted, the callers sample the curve once the y limits are set
+        self._ax.set_xlim(self._x_limits, emit=False)
+        self._ax.set_ylim(
+            np.floor(np.nanmin(voids) * (1 - self.PLOT_Y_PADDING) / self.PLOT_Y_STEP)
+            * self.PLOT_Y_STEP,
+            np.ceil(np.nanmax(voids) * (1 + self.PLOT_Y_PADDING) / self.PLOT_Y_STEP)
+            * self.PLOT_Y_STEP,
         )
         return
 
-    def _set_spline(
-        self, smoothing_degree: int, smoothing_factor: float | None
-    ) -> None:
-        self._spline = UnivariateSpline(
-            np.log10(self._asc_axial_loads),
-            self._asc_void_ratios,
-            s=smoothing_factor,
-            k=smoothing_degree,
+    def _start_blitting(self) -> None:
+        for artist in self._animated_artists():
+            artist.set_animated(True)
+        self._frame_pending = False
+        self._last_frame_time = 0.0
+        self._frame_timer = self._canvas.new_timer(
+            interval=int(self.DRAG_FRAME_INTERVAL * 1000)
         )
-        self._spline_deriv = self._spline.derivative()
+        self._frame_timer.single_shot = True
+        self._frame_timer.add_callback(self._render_drag_frame)
+        self._drawer = self._canvas.mpl_connect("draw_event", self._capture_background)
+        self._canvas.draw()
+        self._canvas.blit(self._figure.bbox)
         return
 
-    def _set_x_limits(self) -> tuple[float, float]:
-        return (
-            10 ** np.floor(np.log10(self._asc_axial_loads[0])),
-            10 ** np.ceil(np.log10(self._asc_axial_loads[-1])),
-        )
+    def _stop_blitting(self) -> None:
+        self._canvas.mpl_disconnect(self._drawer)
+        self._frame_timer.stop()
+        for artist in self._animated_artists():
+            artist.set_animated(False)
+        return
 
-    def _straight_line_function(self, xs) -> np.ndarray:
-        return np.array(
-            np.log10(xs) * self._straight_line_slope + self._straight_line_intercept
-        )
+    def _update_cycles_line(self) -> None:
+        xs, ys, markers = self._cycle_path()
+        self._cycles_line.set_data(xs, ys)
+        self._cycles_line.set_markevery(markers.tolist())
+        return
 
     def _update_lines(self) -> None:
-        self._spline_curve.set_data(
-            self._full_range_linspace,
-            self._spline(np.log10(self._full_range_linspace)),
-        )
         self._straightest_line.set_data(
-            [self._asc_axial_loads[0], self._asc_axial_loads[-1]],
+            [self._result.axial_loads[0], self._result.axial_loads[-1]],
             [
-                self._straight_line_function(self._asc_axial_loads[0]),
-                self._straight_line_function(self._asc_axial_loads[-1]),
+                self._result.straight_line(self._result.axial_loads[0]),
+                self._result.straight_line(self._result.axial_loads[-1]),
             ],
         )
         self._horizontal_line.set_data(
-            [self._knee_x, np.max(self._asc_axial_loads[-1])],
+            [self._result.knee_x, np.max(self._result.axial_loads[-1])],
             [
-                self._knee_y,
+                self._result.knee_y,
             ]
             * 2,
         )
         self._peak_curvature_line.set_data(
-            [self._asc_axial_loads[0], self._asc_axial_loads[-1]],
+            [self._result.axial_loads[0], self._result.axial_loads[-1]],
             [
-                self._peak_curve_function(self._asc_axial_loads[0]),
-                self._peak_curve_function(self._asc_axial_loads[-1]),
+                self._result.peak_curve(self._result.axial_loads[0]),
+                self._result.peak_curve(self._result.axial_loads[-1]),
             ],
         )
         self._bisector_line.set_data(
-            [self._knee_x, self._asc_axial_loads[-1]],
+            [self._result.knee_x, self._result.axial_loads[-1]],
             [
-                self._bisector_function(self._knee_x),
-                self._bisector_function(self._asc_axial_loads[-1]),
+                self._result.bisector(self._result.knee_x),
+                self._result.bisector(self._result.axial_loads[-1]),
             ],
         )
-        self._figure.canvas.draw_idle()
         return
 
     def _update_offset(self, event) -> None:
         self._current_offsets[self._current_index] = (
             event.xdata,
-            self._spline(np.log10(event.xdata)),
+            self._result.spline(np.log10(event.xdata)),
         )
         self._current_artist.set_offsets(self._current_offsets)
-        self._ax.draw_artist(self._current_artist)
-        self._canvas.blit(self._ax.bbox)
-        self._canvas.draw_idle()
+        return
+
+    def _update_plot(self) -> None:
+        # Moves the existing artists to the new result instead of clearing
+        # the axes and creating them again
+        self._clear_uncertainty()
+        self._set_limits()
+        self._update_spline_curve()
+        self._update_lines()
+        self._update_cycles_line()
+        self._p_e_markers.set_data(self._result.axial_loads, self._result.void_ratios)
+        self._straightest_line_handles.set_offsets(
+            np.column_stack(
+                [self._result.straight_line_xs, self._result.straight_line_ys]
+            )
+        )
+        self._peak_curvature_handle.set_offsets(
+            [self._result.knee_x, self._result.knee_y]
+        )
+        self._update_preconsolidation_point()
+        self._draw_switch()
         return
 
     def _update_preconsolidation_point(self) -> None:
-        self._calculate_preconsolidation()
-        self._preconsolidation_annotation.set_text(
-            f"Preconsolidation Pressure: {self._p:.0f}kPa"
+        self._preconsolidation_annotation.set_text(self._preconsolidation_text())
+        self._preconsolidation_point.set_data([self._result.p], [self._result.e])
+        return
+
+    def _update_spline_curve(self, *args) -> None:
+        # Also the xlim_changed and resize_event callback
+        if not hasattr(self, "_spline_curve"):
+            return
+        # Not sampled again for the same spline, view and size
+        key = (
+            self._result.spline,
+            self._ax.get_xlim(),
+            self._ax.get_ylim(),
+            self._ax.bbox.bounds,
         )
-        self._preconsolidation_point.set_offsets([self._p, self._e])
-        self._ax.draw_artist(self._preconsolidation_point)
-        self._canvas.blit(self._ax.bbox)
-        self._canvas.draw_idle()
+        if key == self._curve_key:
+            return
+        self._curve_key = key
+        xs = self._curve_samples()
+        self._spline_curve.set_data(xs, self._result.spline(np.log10(xs)))
         return
 
+    def clear(self) -> None:
+        # Back to empty axes, the next result draws its artists again
+        self._ax.cla()
+        self._curve_key = None
+        self._switch_backgrounds.clear()
+        self._uncertainty = None
+        self._uncertainty_artists = list()
+        for name in ("_result", "_spline_curve"):
+            if hasattr(self, name):
+                delattr(self, name)
+        self._draw()
+        return
+
+    def get_cache_stats(self) -> dict:
+        return self._engine.get_cache_stats()
+
     def get_canvas(self) -> FigureCanvasBase:
         return self._canvas
 
     def get_e(self) -> float:
-        return self._e
+        return self._result.e
+
+    def get_engine(self) -> CasagrandeEngine:
+        return self._engine
+
+    def get_figure(self) -> Figure:
+        return self._figure
+
+    def get_knee(self) -> tuple[float, float]:
+        return self._result.knee_x, self._result.knee_y
 
     def get_p(self) -> float:
-        return self._p
+        return self._result.p
 
-    def set_data(self, axial_loads_kpa: np.ndarray, void_ratios: np.ndarray) -> None:
-        self._axial_loads_kpa = axial_loads_kpa
-        self._void_ratios = void_ratios
-        self._asc_axial_loads, mask = self._ascending_values(
-            self._axial_loads_kpa, return_index=True
+    def get_result(self) -> CasagrandeResult:
+        return self._result
+
+    def get_straight_line(self) -> tuple[float, float]:
+        return self._result.slope, self._result.intercept
+
+    def reset_handles(self) -> None:
+        self._clear_uncertainty()
+        self._result = self._engine.reset_handles(self._result)
+        self._peak_curvature_handle.set_offsets(
+            [self._result.knee_x, self._result.knee_y]
         )
-        self._asc_void_ratios = self._void_ratios[mask]
-        self._full_range_linspace = np.linspace(
-            self._asc_axial_loads[0], self._asc_axial_loads[-1], self.LINSPACE_RANGE
+        self._straightest_line_handles.set_offsets(
+            np.column_stack(
+                [self._result.straight_line_xs, self._result.straight_line_ys]
+            )
         )
-        self._set_knee_point()
-        self._initial_draw_plot()
+        self._update_lines()
+        self._update_preconsolidation_point()
+        self._canvas.draw_idle()
+        return
+
+    def set_data(self, axial_loads_kpa: np.ndarray, void_ratios: np.ndarray) -> None:
+        self.set_result(self._engine.compute(axial_loads_kpa, void_ratios))
+        return
+
+    def set_result(self, result: CasagrandeResult, reuse_artists: bool = True) -> None:
+        # The artists of the previous result are updated in place unless
+        # reuse_artists is False, which clears the axes and builds them again
+        reuse_artists = reuse_artists and hasattr(self, "_result")
+        self._result = result
+        with profiler.stage("draw", n_points=len(result.axial_loads)):
+            if reuse_artists:
+                self._update_plot()
+            else:
+                self._initial_draw_plot()
+        return
+
+    def set_title(self, title: str) -> None:
+        self._ax.set_title(title)
+        self._switch_backgrounds.clear()
+        return
+
+    def set_result_cache_capacity(self, capacity: int) -> None:
+        self._engine.set_cache_capacity(capacity)
+        return
 
     def set_interactive(self) -> None:
         # TODO Need show to load up tk backend as built in to show? Also need to generate fig using pyplot if run as a script??
-        self._canvas.mpl_connect("pick_event", self._click_handle)
+        if self._picker is None:  # Connected once, the handles are kept
+            self._picker = self._canvas.mpl_connect("pick_event", self._click_handle)
         self._ax.fmt_xdata = lambda x: f"{x:.3f}"
         self._ax.fmt_ydata = lambda y: f"{y:.3f}"
         self._canvas.draw_idle()
         return
 
-    def save_plot(self, filename: str) -> None:
-        self._figure.savefig(f"{filename}.png", dpi="figure", format="png")
+    def show_uncertainty(self, uncertainty: UncertaintyResult) -> None:
+        # Histogram of the realisations' p along the bottom of the plot, with
+        # the outer percentiles shaded and the median marked
+        self._clear_uncertainty()
+        self._uncertainty = uncertainty
+        p = uncertainty.p[np.isfinite(uncertainty.p)]
+        if len(p):
+            counts, edges = np.histogram(
+                p,
+                bins=np.logspace(
+                    np.log10(p.min()), np.log10(p.max()), self.UNCERTAINTY_BINS + 1
+                ),
+            )
+            low, high = uncertainty.interval()
+            self._uncertainty_artists = [
+                self._ax.stairs(
+                    counts / counts.max() * self.UNCERTAINTY_HEIGHT,
+                    edges,
+                    fill=True,
+                    color="grey",
+                    alpha=0.5,
+                    transform=blended_transform_factory(
+                        self._ax.transData, self._ax.transAxes
+                    ),
+                    label="uncertainty_histogram",
+                ),
+                self._ax.axvspan(
+                    low, high, color="grey", alpha=0.15, lw=0, label="uncertainty_span"
+                ),
+                self._ax.axvline(
+                    np.median(p),
+                    color="black",
+                    linestyle=":",
+                    label="uncertainty_median",
+                ),
+            ]
+        self._update_preconsolidation_point()
+        self._canvas.draw_idle()
+        return
+
+    def save_plot(self, filename: str, format: str = "png", dpi="figure") -> None:
+        self._figure.savefig(f"{filename}.{format}", dpi=dpi, format=format)
         return
 
 
@@ -1,13 +1,37 @@
 import pandas as pd
 from python_ags4 import AGS4
 
+from .ags_cache import ParsedAGSCache
+from .ags_reader import read_ags_groups
+from .profiling import profiler
+from .sample_index import SampleIndex
+
 
 class ProcessAGS:
-    def __init__(self, file_name: str) -> None:
+
+    CONS_NUMERIC_DTYPES = {
+        "CONS_INCN": "float64",
+        "CONS_INCF": "float64",
+        "CONS_INCE": "float64",
+    }
+
+    def __init__(
+        self, file_name: str, streaming: bool = False, groups: tuple = ("CONS",)
+    ) -> None:
         self._file_name = file_name
-        self._main()
+        self._streaming = streaming
+        self._groups = groups
+        with profiler.stage("parse", file=file_name, streaming=streaming):
+            self._main()
 
     def _main(self):
+        if self._streaming:
+            self._ags_tables, self._ags_table_headings = read_ags_groups(
+                self._file_name,
+                groups=self._groups,
+                dtypes={"CONS": self.CONS_NUMERIC_DTYPES},
+            )
+            return
         # self._ags_errors = AGS4.check_file(self._file_name)
         self._ags_tables, self._ags_table_headings = AGS4.AGS4_to_dataframe(
             self._file_name
@@ -45,33 +69,50 @@ class ProcessAGS:
         if "CONS" in self._ags_table_headings and all(
             heading in self._ags_table_headings["CONS"] for heading in filter_columns
         ):
-            df_cons = self._ags_tables["CONS"]
-            df_cons = df_cons.filter(filter_columns)
-            df_cons = df_cons.drop([0, 1])
-            for column, cast_type in coerse_columns.items():
-                df_cons[column] = pd.to_numeric(df_cons[column], downcast=cast_type)
-            df_cons = df_cons.sort_values(
-                sort_values,
-                ascending=[
-                    True,
-                ]
-                * len(sort_values),
-            )
-            df_cons = df_cons.reset_index(drop=True)
-            df_cons["SAMP_NAME"] = (
-                df_cons["LOCA_ID"]
-                + "_"
-                + df_cons["SAMP_TOP"]
-                + "m_"
-                + df_cons["SAMP_TYPE"]
-                + "_"
-                + df_cons["SAMP_REF"]
-            )
-            df_cons = df_cons.filter(export_columns)
+            with profiler.stage("filter_sort"):
+                df_cons = self._ags_tables["CONS"]
+                df_cons = df_cons.filter(filter_columns)
+                if not self._streaming:
+                    df_cons = df_cons.drop([0, 1])  # UNIT and TYPE rows
+                for column, cast_type in coerse_columns.items():
+                    df_cons[column] = pd.to_numeric(df_cons[column], downcast=cast_type)
+                df_cons = df_cons.sort_values(
+                    sort_values,
+                    ascending=[
+                        True,
+                    ]
+                    * len(sort_values),
+                )
+                df_cons = df_cons.reset_index(drop=True)
+                df_cons["SAMP_NAME"] = (
+                    df_cons["LOCA_ID"]
+                    + "_"
+                    + df_cons["SAMP_TOP"]
+                    + "m_"
+                    + df_cons["SAMP_TYPE"]
+                    + "_"
+                    + df_cons["SAMP_REF"]
+                )
+                df_cons = df_cons.filter(export_columns)
             return df_cons
 
         return None
 
+    def get_sample_index(self) -> SampleIndex | None:
+        df_cons = self.get_cons_for_preconsolidation()
+        return None if df_cons is None else SampleIndex.from_frame(df_cons)
+
+
+def load_cons_for_preconsolidation(
+    file_name: str, cache: ParsedAGSCache | None = None, streaming: bool = True
+) -> pd.DataFrame | None:
+    if cache is not None and (df_cons := cache.get(file_name)) is not None:
+        return df_cons
+    df_cons = ProcessAGS(file_name, streaming=streaming).get_cons_for_preconsolidation()
+    if cache is not None and df_cons is not None:
+        cache.put(file_name, df_cons)
+    return df_cons
+
 
 if __name__ == "__main__":
     ags = ProcessAGS("example_4.ags")
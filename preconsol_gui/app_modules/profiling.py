@@ -0,0 +1,98 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Profiler:
+
+    # Times named pipeline stages. Disabled stages cost one attribute check,
+    # so the hooks stay in place permanently and are switched at runtime.
+    def __init__(
+        self, log_file: str | Path | None = None, enabled: bool | None = None
+    ) -> None:
+        if log_file is None:
+            log_file = os.environ.get(
+                "PRECONSOL_GUI_PROFILE_LOG",
+                Path.home() / ".cache" / "preconsol_gui" / "profile.jsonl",
+            )
+        if enabled is None:
+            enabled = os.environ.get("PRECONSOL_GUI_PROFILE", "0") == "1"
+        self._log_file = Path(log_file)
+        self._enabled = enabled
+        self._lock = threading.Lock()  # Stages run on worker threads
+        self._timings = dict()
+
+    def _record(self, name: str, seconds: float, context: dict) -> None:
+        record = {
+            "time": time.time(),
+            "stage": name,
+            "seconds": seconds,
+            "thread": threading.current_thread().name,
+            **context,
+        }
+        with self._lock:
+            self._timings[name] = seconds
+            try:
+                self._log_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self._log_file, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+            except OSError:
+                pass  # Timings still reach the status bar
+        return
+
+    @contextmanager
+    def capture(self, file_name: str | Path):
+        # cProfile everything inside the block, for one sample at a time. The
+        # .prof output opens in pstats, snakeviz or a flame graph viewer.
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            profile.dump_stats(str(file_name))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._timings.clear()
+        return
+
+    def get_log_file(self) -> Path:
+        return self._log_file
+
+    def get_timings(self) -> dict:
+        with self._lock:
+            return dict(self._timings)
+
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    def set_enabled(self, enabled: bool) -> None:
+        self._enabled = enabled
+        return
+
+    def set_log_file(self, log_file: str | Path) -> None:
+        self._log_file = Path(log_file)
+        return
+
+    @contextmanager
+    def stage(self, name: str, **context):
+        if not self._enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - start, context)
+
+
+profiler = Profiler()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,69 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    def __init__(self, capacity: int = 128) -> None:
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()  # Results are computed on worker threads
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        return
+
+    def get(self, key: str) -> object | None:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def get_stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "capacity": self._capacity,
+        }
+
+    def put(self, key: str, value: object) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+        return
+
+    def set_capacity(self, capacity: int) -> None:
+        with self._lock:
+            self._capacity = capacity
+            while len(self._entries) > max(capacity, 0):
+                self._entries.popitem(last=False)
+        return
+
+    @staticmethod
+    def make_key(*arrays: np.ndarray, **parameters) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for array in arrays:
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        digest.update(repr(sorted(parameters.items())).encode())
+        return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    pass
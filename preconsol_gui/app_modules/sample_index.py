@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+
+class SampleIndex:
+
+    # Every sample's increments sit in one contiguous slice of the typed
+    # arrays, so looking a sample up is an offset and a length, and the
+    # arrays handed out are read-only views rather than copies. The arrays
+    # may be memory-mapped, see cons_store.
+    def __init__(
+        self,
+        names: np.ndarray,
+        sample_ids: np.ndarray,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+        axial_loads_kpa: np.ndarray,
+        void_ratios: np.ndarray,
+        increments: np.ndarray | None = None,
+    ) -> None:
+        self._names = names
+        self._sample_ids = sample_ids
+        self._offsets = offsets
+        self._lengths = lengths
+        self._axial_loads_kpa = axial_loads_kpa
+        self._void_ratios = void_ratios
+        self._increments = (
+            np.zeros(len(axial_loads_kpa), dtype=np.int32)
+            if increments is None
+            else increments
+        )
+        self._positions = None  # Built on the first lookup by name
+        for array in (self._axial_loads_kpa, self._void_ratios, self._increments):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _position(self, sample: int | str) -> int:
+        if not isinstance(sample, str):
+            return sample
+        if self._positions is None:
+            self._positions = {str(name): i for i, name in enumerate(self._names)}
+        return self._positions[sample]
+
+    def _slice(self, sample: int | str) -> slice:
+        i = self._position(sample)
+        start = self._offsets[i]
+        return slice(start, start + self._lengths[i])
+
+    @classmethod
+    def concat(cls, indices: list["SampleIndex"]) -> "SampleIndex":
+        lengths = np.concatenate([index._lengths for index in indices])
+        return cls(
+            names=np.concatenate([index._names for index in indices]),
+            sample_ids=np.concatenate([index._sample_ids for index in indices]),
+            offsets=np.cumsum(lengths) - lengths,
+            lengths=lengths,
+            axial_loads_kpa=np.concatenate(
+                [index._axial_loads_kpa for index in indices]
+            ),
+            void_ratios=np.concatenate([index._void_ratios for index in indices]),
+            increments=np.concatenate([index._increments for index in indices]),
+        )
+
+    @classmethod
+    def from_frame(cls, df_cons: pd.DataFrame) -> "SampleIndex":
+        # Samples keep their order of first appearance, as SAMP_NAME.unique()
+        codes, names = pd.factorize(df_cons["SAMP_NAME"], sort=False)
+        order = np.argsort(codes, kind="stable")
+        lengths = np.bincount(codes, minlength=len(names))
+        offsets = np.cumsum(lengths) - lengths
+        return cls(
+            names=np.asarray(names, dtype=object),
+            sample_ids=df_cons["SAMP_ID"].to_numpy()[order][offsets],
+            offsets=offsets,
+            lengths=lengths,
+            axial_loads_kpa=df_cons["CONS_INCF"].to_numpy(dtype=float)[order],
+            void_ratios=df_cons["CONS_INCE"].to_numpy(dtype=float)[order],
+            increments=(
+                df_cons["CONS_INCN"].fillna(0).to_numpy(dtype=np.int32)[order]
+                if "CONS_INCN" in df_cons
+                else None
+            ),
+        )
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "names": self._names,
+            "sample_ids": self._sample_ids,
+            "offsets": self._offsets,
+            "lengths": self._lengths,
+            "axial_loads_kpa": self._axial_loads_kpa,
+            "void_ratios": self._void_ratios,
+            "increments": self._increments,
+        }
+
+    def get_increments(self, sample: int | str) -> np.ndarray:
+        return self._increments[self._slice(sample)]
+
+    def get_lengths(self) -> np.ndarray:
+        return self._lengths
+
+    def get_names(self) -> np.ndarray:
+        return self._names
+
+    def get_position(self, name: str) -> int:
+        return self._position(name)
+
+    def get_sample(self, sample: int | str) -> tuple[np.ndarray, np.ndarray]:
+        rows = self._slice(sample)
+        return self._axial_loads_kpa[rows], self._void_ratios[rows]
+
+    def get_sample_id(self, sample: int | str) -> str:
+        return self._sample_ids[self._position(sample)]
+
+    def get_samples(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        return [self.get_sample(i) for i in range(len(self))]
+
+    def take(self, positions: list[int]) -> "SampleIndex":
+        rows = [self._slice(i) for i in positions]
+        lengths = self._lengths[positions]
+
+        def gather(array: np.ndarray) -> np.ndarray:
+            return np.concatenate([array[r] for r in rows] or [array[:0]])
+
+        return SampleIndex(
+            names=self._names[positions],
+            sample_ids=self._sample_ids[positions],
+            offsets=np.cumsum(lengths) - lengths,
+            lengths=lengths,
+            axial_loads_kpa=gather(self._axial_loads_kpa),
+            void_ratios=gather(self._void_ratios),
+            increments=gather(self._increments),
+        )
+
+
+if __name__ == "__main__":
+    pass
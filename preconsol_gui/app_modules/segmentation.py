@@ -0,0 +1,109 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from .knee import pad_curves
+
+VIRGIN_LOADING, UNLOADING, RELOADING = 0, 1, 2
+BRANCH_NAMES = ("virgin_loading", "unloading", "reloading")
+
+
+class LoadBranches(NamedTuple):
+    axial_loads: np.ndarray  # Every increment, in test order
+    void_ratios: np.ndarray
+    branch: np.ndarray  # VIRGIN_LOADING, UNLOADING or RELOADING
+    cycle: np.ndarray  # Unload-reload cycles started up to each increment
+
+    @property
+    def n_cycles(self) -> int:
+        return int(self.cycle[-1]) if len(self.cycle) else 0
+
+    @property
+    def reloading(self) -> np.ndarray:
+        return self.branch == RELOADING
+
+    @property
+    def unloading(self) -> np.ndarray:
+        return self.branch == UNLOADING
+
+    @property
+    def virgin_loading(self) -> np.ndarray:
+        return self.branch == VIRGIN_LOADING
+
+
+def segment_loads(
+    loads: np.ndarray | list[np.ndarray], lengths: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    # Branch and cycle of every increment, one row per sample: either a
+    # ragged list of arrays or a padded 2-D array with the valid length of
+    # every row. Padding has branch -1.
+    #
+    # An increment is virgin loading when its load is above every load
+    # before it (the first always is). Otherwise it is unloading when the
+    # load last changed downwards and reloading when it last changed
+    # upwards, so a repeated load stays on the branch it is on. A cycle
+    # starts at each unloading that follows loading or reloading.
+    if lengths is None:
+        loads, lengths = pad_curves(loads)
+    loads = np.atleast_2d(np.asarray(loads, dtype=float))
+    lengths = np.asarray(lengths, dtype=np.intp)
+    n_rows, width = loads.shape
+    columns = np.arange(width)
+    valid = columns < lengths[:, None]
+
+    # The running maximum skips missing loads, except a missing first load,
+    # which no later load can rise above
+    previous_max = np.full_like(loads, np.nan)
+    previous_max[:, 1:] = np.where(
+        np.isnan(loads[:, :1]),
+        np.nan,
+        np.fmax.accumulate(np.where(valid, loads, np.nan), axis=1)[:, :-1],
+    )
+    with np.errstate(invalid="ignore"):
+        virgin = (loads > previous_max) | (columns == 0)
+        step = np.zeros_like(loads)
+        step[:, 1:] = np.sign(np.diff(loads, axis=1))
+    step[np.isnan(step)] = 0
+    step[virgin] = 1
+    # Carry the last direction over repeated loads
+    changed = np.where(step != 0, columns, 0)
+    direction = step[np.arange(n_rows)[:, None], np.maximum.accumulate(changed, axis=1)]
+
+    branch = np.where(
+        virgin, VIRGIN_LOADING, np.where(direction < 0, UNLOADING, RELOADING)
+    ).astype(np.int8)
+    branch[~valid] = -1
+    unloading = branch == UNLOADING
+    starts = unloading & ~np.concatenate(
+        [np.zeros((n_rows, 1), dtype=bool), unloading[:, :-1]], axis=1
+    )
+    cycle = np.cumsum(starts, axis=1)
+    return branch, cycle
+
+
+def segment_curves(
+    curves: list[tuple[np.ndarray, np.ndarray]],
+) -> list[LoadBranches]:
+    # Segments every sample in one pass
+    curves = [
+        (np.asarray(axial_loads, dtype=float), np.asarray(void_ratios, dtype=float))
+        for axial_loads, void_ratios in curves
+    ]
+    branch, cycle = segment_loads([axial_loads for axial_loads, _ in curves])
+    return [
+        LoadBranches(
+            axial_loads=axial_loads,
+            void_ratios=void_ratios,
+            branch=branch[row, : len(axial_loads)],
+            cycle=cycle[row, : len(axial_loads)],
+        )
+        for row, (axial_loads, void_ratios) in enumerate(curves)
+    ]
+
+
+def segment_curve(axial_loads: np.ndarray, void_ratios: np.ndarray) -> LoadBranches:
+    return segment_curves([(axial_loads, void_ratios)])[0]
+
+
+if __name__ == "__main__":
+    pass
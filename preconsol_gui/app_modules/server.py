@@ -0,0 +1,487 @@
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import numpy as np
+
+from .casagrande import CasagrandeEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.005  # Seconds a batch waits for more requests to join it
+MAX_BATCH_SAMPLES = 512
+MAX_BODY_BYTES = 64 * 1024 * 1024
+METRICS_WINDOW = 1000  # Latest requests the latency percentiles cover
+REQUEST_TIMEOUT = 120
+RESULT_KEYS = (
+    "preconsolidation_kpa",
+    "void_ratio",
+    "knee_kpa",
+    "knee_void_ratio",
+    "slope",
+    "intercept",
+    "bisector_slope",
+    "straight_line_kpa",
+    "straight_line_void_ratios",
+    "n_points",
+    "n_virgin_loading",
+    "n_cycles",
+    "error",
+)
+
+_engines = dict()  # Each worker process keeps an engine per set of options
+
+
+def _compute_ags(data: bytes, options: tuple) -> list[dict]:
+    # Runs in a worker process. The upload is parsed from a temporary file
+    # as ProcessAGS reads from a path.
+    from .process_ags import load_cons_for_preconsolidation
+    from .sample_index import SampleIndex
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "upload.ags")
+        with open(file_name, "wb") as f:
+            f.write(data)
+        df_cons = load_cons_for_preconsolidation(file_name)
+    if df_cons is None:
+        raise ValueError("File has no CONS group with the required headings")
+    index = SampleIndex.from_frame(df_cons)
+    return [
+        dict(sample=str(name), **row)
+        for name, row in zip(
+            index.get_names(), _compute_batch(index.get_samples(), options)
+        )
+    ]
+
+
+def _compute_batch(
+    curves: list[tuple[np.ndarray, np.ndarray]], options: tuple
+) -> list[dict]:
+    # Runs in a worker process. Results go back as plain values, not splines.
+    if options not in _engines:
+        smoothing_degree, smoothing_factor, knee_method = options
+        _engines[options] = CasagrandeEngine(
+            smoothing_degree=smoothing_degree,
+            smoothing_factor=smoothing_factor,
+            cache_capacity=0,
+            knee_method=knee_method,
+        )
+    return [_result_values(result) for result in _engines[options].compute_many(curves)]
+
+
+def _failed_future(error: Exception) -> Future:
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def _finite(value) -> float | None:
+    # JSON has no NaN or infinity
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _parse_options(query: dict) -> tuple:
+    # Engine options from a JSON body or query string, checked before they
+    # reach a worker
+    smoothing_degree = int(query.get("smoothing_degree", 2))
+    if not 1 <= smoothing_degree <= 5:
+        raise ValueError("smoothing_degree must be between 1 and 5")
+    smoothing_factor = query.get("smoothing_factor", 0)
+    if smoothing_factor is not None:
+        smoothing_factor = float(smoothing_factor)
+        if not smoothing_factor >= 0:
+            raise ValueError("smoothing_factor must be 0 or more")
+    knee_method = query.get("knee_method", "kneedle")
+    if knee_method not in CasagrandeEngine.KNEE_METHODS:
+        raise ValueError(
+            f"knee_method must be one of {', '.join(CasagrandeEngine.KNEE_METHODS)}"
+        )
+    return smoothing_degree, smoothing_factor, knee_method
+
+
+def _parse_samples(body: dict) -> tuple[list[str | None], list]:
+    # One sample as {"axial_loads_kpa": [...], "void_ratios": [...]} or
+    # several as {"samples": [{"name": ..., ...}, ...]}
+    samples = body["samples"] if "samples" in body else [body]
+    if not isinstance(samples, list):
+        raise ValueError("samples must be a list")
+    names, curves = list(), list()
+    for sample in samples:
+        axial_loads = np.asarray(sample["axial_loads_kpa"], dtype=float)
+        void_ratios = np.asarray(sample["void_ratios"], dtype=float)
+        if axial_loads.ndim != 1 or axial_loads.shape != void_ratios.shape:
+            raise ValueError(
+                "axial_loads_kpa and void_ratios must be lists of the same length"
+            )
+        names.append(sample.get("name"))
+        curves.append((axial_loads, void_ratios))
+    return names, curves
+
+
+def _percentiles(latencies: deque) -> dict:
+    if not latencies:
+        return {"count": 0}
+    ms = np.array(latencies) * 1000
+    return {
+        "count": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def _ping() -> None:
+    return
+
+
+def _result_values(result) -> dict:
+    if isinstance(result, Exception):
+        return {key: None for key in RESULT_KEYS} | {
+            "error": f"{type(result).__name__}: {result}"
+        }
+    return {
+        "preconsolidation_kpa": _finite(result.p),
+        "void_ratio": _finite(result.e),
+        "knee_kpa": _finite(result.knee_x),
+        "knee_void_ratio": _finite(result.knee_y),
+        "slope": _finite(result.slope),
+        "intercept": _finite(result.intercept),
+        "bisector_slope": _finite(result.spline_deriv(result.knee_log10_x) / 2),
+        "straight_line_kpa": [_finite(x) for x in result.straight_line_xs],
+        "straight_line_void_ratios": [_finite(y) for y in result.straight_line_ys],
+        "n_points": result.diagnostics.n_points,
+        "n_virgin_loading": result.diagnostics.n_ascending,
+        "n_cycles": result.diagnostics.n_cycles,
+        "error": result.diagnostics.message,
+    }
+
+
+def _warm_worker() -> None:
+    # Imports scipy, pandas and python_ags4 and runs one computation before
+    # the first request reaches the worker
+    from . import process_ags  # noqa: F401
+
+    loads = np.geomspace(10, 1000, 8)
+    _compute_batch([(loads, 1 - 0.1 * np.log10(loads) ** 2)], (2, 0, "kneedle"))
+    return
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ComputeService:
+
+    # Samples from concurrent requests with the same options are gathered
+    # for BATCH_WINDOW seconds, up to MAX_BATCH_SAMPLES, and computed as one
+    # task on a pool of worker processes started and warmed up front.
+    # Workers are spawned rather than forked, so they never inherit the
+    # server's threads.
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        batch_window: float = BATCH_WINDOW,
+        max_batch_samples: int = MAX_BATCH_SAMPLES,
+    ) -> None:
+        self._batch_window = batch_window
+        self._max_batch_samples = max_batch_samples
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        for future in [self._executor.submit(_ping) for _ in range(self._max_workers)]:
+            future.result()  # Every worker started and warmed up
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._queued_samples = 0
+        self._in_flight_tasks = 0
+        self._latencies = dict()  # Endpoint to recent request durations
+        self._counts = dict(requests=0, errors=0, samples=0, batches=0, ags_files=0)
+        self._started = time.monotonic()
+        self._closed = threading.Event()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="compute-batcher", daemon=True
+        )
+        self._dispatcher.start()
+
+    def _dispatch(self) -> None:
+        # Waits for a request, gathers the others arriving within the batch
+        # window and sends each set of options to the pool as one task
+        while not self._closed.is_set():
+            try:
+                batch = [self._pending.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            n_samples = len(batch[0][1])
+            deadline = time.monotonic() + self._batch_window
+            while n_samples < self._max_batch_samples:
+                try:
+                    item = self._pending.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n_samples += len(item[1])
+            groups = dict()
+            for options, curves, future in batch:
+                groups.setdefault(options, list()).append((curves, future))
+            for options, requests in groups.items():
+                self._submit(options, requests)
+        return
+
+    def _finish_batch(self, requests: list, task: Future) -> None:
+        with self._lock:
+            self._in_flight_tasks -= 1
+        try:
+            values = task.result()
+        except Exception as error:  # Worker process died
+            for _, future in requests:
+                future.set_exception(error)
+            return
+        start = 0
+        for curves, future in requests:
+            future.set_result(values[start : start + len(curves)])
+            start += len(curves)
+        return
+
+    def _submit(self, options: tuple, requests: list) -> None:
+        curves = [curve for request_curves, _ in requests for curve in request_curves]
+        with self._lock:
+            self._queued_samples -= len(curves)
+            self._in_flight_tasks += 1
+            self._counts["batches"] += 1
+        try:
+            task = self._executor.submit(_compute_batch, curves, options)
+        except Exception as error:  # Pool shut down
+            self._finish_batch(requests, _failed_future(error))
+            return
+        task.add_done_callback(lambda task: self._finish_batch(requests, task))
+        return
+
+    def close(self) -> None:
+        self._closed.set()
+        self._dispatcher.join()
+        self._executor.shutdown(cancel_futures=True)
+        return
+
+    def compute(
+        self,
+        curves: list[tuple[np.ndarray, np.ndarray]],
+        options: tuple = (2, 0, "kneedle"),
+    ) -> list[dict]:
+        # Blocks the calling thread until the batch holding the curves is done.
+        # No curves make no batch.
+        if not curves:
+            return list()
+        future = Future()
+        with self._lock:
+            self._queued_samples += len(curves)
+            self._counts["samples"] += len(curves)
+        self._pending.put((options, curves, future))
+        return future.result(timeout=REQUEST_TIMEOUT)
+
+    def compute_ags(self, data: bytes, options: tuple = (2, 0, "kneedle")) -> list:
+        # A file is batch enough, so it goes straight to the pool
+        with self._lock:
+            self._in_flight_tasks += 1
+        try:
+            results = self._executor.submit(_compute_ags, data, options).result(
+                timeout=REQUEST_TIMEOUT
+            )
+        finally:
+            with self._lock:
+                self._in_flight_tasks -= 1
+        with self._lock:
+            self._counts["ags_files"] += 1
+        return results
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_s": time.monotonic() - self._started,
+                "workers": self._max_workers,
+                "queue_depth": self._queued_samples,
+                "in_flight_tasks": self._in_flight_tasks,
+                **self._counts,
+                "mean_batch_samples": (
+                    self._counts["samples"] / self._counts["batches"]
+                    if self._counts["batches"]
+                    else None
+                ),
+                "latency": {
+                    endpoint: _percentiles(latencies)
+                    for endpoint, latencies in self._latencies.items()
+                },
+            }
+
+    def record(self, endpoint: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=METRICS_WINDOW)).append(
+                seconds
+            )
+            self._counts["requests"] += 1
+            self._counts["errors"] += failed
+        return
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"  # Keep-alive for clients sending many requests
+    server_version = "preconsol-gui"
+
+    def _read_body(self) -> bytes:
+        # Read before routing, so an error response leaves no unread bytes to be
+        # parsed as the next request on a kept-alive connection. A body that is
+        # not read ends the connection instead.
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise _HTTPError(400, "Content-Length must be a non-negative integer")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise _HTTPError(413, f"Request body is over {MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def _respond(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+        return
+
+    def _route(self, method: str) -> None:
+        path, _, query_string = self.path.partition("?")
+        routes = {
+            ("GET", "/health"): self._health,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/compute"): self._compute,
+            ("POST", "/ags"): self._ags,
+        }
+        start = time.perf_counter()
+        status = 500
+        try:
+            body = self._read_body()
+            if (method, path) not in routes:
+                raise _HTTPError(404, f"No {method} {path}")
+            status, payload = 200, routes[method, path](query_string, body)
+        except _HTTPError as error:
+            status, payload = error.status, {"error": str(error)}
+        except (KeyError, TypeError, ValueError) as error:
+            status = 400
+            payload = {"error": f"{type(error).__name__}: {error}"}
+        except Exception as error:
+            logger.exception("%s %s failed", method, path)
+            payload = {"error": f"{type(error).__name__}: {error}"}
+        self._respond(status, payload)
+        if (method, path) in routes and path != "/metrics":
+            self.server.service.record(
+                path, time.perf_counter() - start, failed=status != 200
+            )
+        return
+
+    def _ags(self, query_string: str, body: bytes) -> dict:
+        options = _parse_options(dict(parse_qsl(query_string)))
+        return {"results": self.server.service.compute_ags(body, options)}
+
+    def _compute(self, query_string: str, body: bytes) -> dict:
+        body = json.loads(body)
+        if not isinstance(body, dict):
+            raise ValueError("The request body must be a JSON object")
+        options = _parse_options(body)
+        names, curves = _parse_samples(body)
+        results = self.server.service.compute(curves, options)
+        return {
+            "results": [
+                dict(sample=name, **values) if name is not None else values
+                for name, values in zip(names, results)
+            ]
+        }
+
+    def _health(self, query_string: str, body: bytes) -> dict:
+        return {"status": "ok"}
+
+    def _metrics(self, query_string: str, body: bytes) -> dict:
+        return self.server.service.get_metrics()
+
+    def do_GET(self) -> None:
+        self._route("GET")
+        return
+
+    def do_POST(self) -> None:
+        self._route("POST")
+        return
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s " + format, self.address_string(), *args)
+        return
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    service: ComputeService | None = None,
+    **options,
+) -> ThreadingHTTPServer:
+    # Only localhost and loopback addresses are served. Port 0 picks a free port, see
+    # server.server_address. Other options go to ComputeService.
+    if host != "localhost" and not ipaddress.ip_address(host).is_loopback:
+        raise ValueError(f"{host} is not a loopback address")
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.daemon_threads = True
+    server.service = service or ComputeService(**options)
+    return server
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, **options) -> None:
+    server = make_server(host, port, **options)
+    logger.info(
+        "Serving on http://%s:%d with %d workers",
+        *server.server_address[:2],
+        server.service.get_metrics()["workers"],
+    )
+    if threading.current_thread() is threading.main_thread():
+        # Stopped like Ctrl+C, shutting the workers down. shutdown waits for
+        # serve_forever, so it is called from another thread.
+        signal.signal(
+            signal.SIGTERM,
+            lambda *args: threading.Thread(target=server.shutdown).start(),
+        )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,221 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .ags_cache import ParsedAGSCache
+from .casagrande import CasagrandeEngine
+from .knee import find_knees
+from .segmentation import segment_curves
+from .workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+SWEEP_COLUMNS = [
+    "FILE",
+    "SAMP_NAME",
+    "SMOOTHING_DEGREE",
+    "SMOOTHING_FACTOR",
+    "PRECONSOLIDATION_KPA",
+    "ERROR",
+]
+STABILITY_COLUMNS = [
+    "FILE",
+    "SAMP_NAME",
+    "P_MIN_KPA",
+    "P_MEDIAN_KPA",
+    "P_MAX_KPA",
+    "RELATIVE_SPREAD",
+    "N_FAILED",
+]
+SAMPLES_PER_TASK = 64
+
+
+def _sweep_samples(
+    curves: list[tuple[np.ndarray, np.ndarray]],
+    grid: list[tuple[int, float]],
+    knee_method: str,
+) -> list[list[tuple[float, str]]]:
+    # Runs in a worker process. Only p and the error go back, not the splines.
+    # The chunk is segmented in one pass and, as kneedle knees do not depend
+    # on the spline, its knees are found in one vectorised pass too.
+    engine = CasagrandeEngine(cache_capacity=0, knee_method=knee_method)
+    all_branches = segment_curves(curves)
+    knees = [None] * len(curves)
+    if knee_method == "kneedle":
+        knees = list(
+            zip(
+                *find_knees(
+                    [b.axial_loads[b.virgin_loading] for b in all_branches],
+                    [b.void_ratios[b.virgin_loading] for b in all_branches],
+                )
+            )
+        )
+    rows = list()
+    for branches, knee in zip(all_branches, knees):
+        results = engine.sweep(
+            branches.axial_loads,
+            branches.void_ratios,
+            grid,
+            knee=knee,
+            branches=branches,
+        )
+        rows.append(
+            [
+                (
+                    (np.nan, f"{type(result).__name__}: {result}")
+                    if isinstance(result, Exception)
+                    else (result.p, result.diagnostics.message)
+                )
+                for result in (results[point] for point in grid)
+            ]
+        )
+    return rows
+
+
+def plot_stability_heatmap(df_sweep: pd.DataFrame, file_name: str) -> None:
+    # One row per sample, one column per (k, s), coloured by how far p is
+    # from the sample's median over the grid. Failed points are left blank.
+    from matplotlib.figure import Figure
+
+    df_sweep = df_sweep.dropna(subset=["SAMP_NAME"])
+    df_sweep = df_sweep.assign(
+        LABEL=df_sweep["SAMP_NAME"].astype(str)
+        + " ("
+        + df_sweep["FILE"].map(lambda f: Path(f.split(";")[0]).name)
+        + ")",
+        GRID=[
+            f"k={k} s={s:g}"
+            for k, s in zip(df_sweep["SMOOTHING_DEGREE"], df_sweep["SMOOTHING_FACTOR"])
+        ],
+    )
+    df_p = df_sweep.pivot_table(
+        index="LABEL",
+        columns="GRID",
+        values="PRECONSOLIDATION_KPA",
+        sort=False,
+        dropna=False,
+    )
+    deviation = df_p.div(df_p.median(axis=1), axis=0) - 1
+    limit = np.nanmax(np.abs(deviation.to_numpy()), initial=0.01)
+
+    figure = Figure(figsize=(2 + 0.9 * df_p.shape[1], 1.5 + 0.3 * df_p.shape[0]))
+    ax = figure.subplots(1, 1)
+    image = ax.imshow(
+        np.ma.masked_invalid(deviation.to_numpy() * 100),
+        cmap="RdBu_r",
+        vmin=-limit * 100,
+        vmax=limit * 100,
+        aspect="auto",
+    )
+    ax.set_xticks(np.arange(df_p.shape[1]), df_p.columns, rotation=45, ha="right")
+    ax.set_yticks(np.arange(df_p.shape[0]), df_p.index)
+    if df_p.size <= 600:  # Label the cells while they are large enough to read
+        for (row, column), p in np.ndenumerate(df_p.to_numpy()):
+            if np.isfinite(p):
+                ax.text(column, row, f"{p:.0f}", ha="center", va="center", size=7)
+    figure.colorbar(image, ax=ax, label="Difference from sample median p [%]")
+    ax.set_title("Preconsolidation pressure over smoothing parameters")
+    figure.tight_layout()
+    figure.savefig(file_name, dpi=150)
+    return
+
+
+def run_sweep(
+    files: list[Path],
+    smoothing_degrees: list[int],
+    smoothing_factors: list[float],
+    knee_method: str = "kneedle",
+    max_workers: int | None = None,
+    streaming: bool = True,
+    cache: ParsedAGSCache | None = None,
+    store: Path | None = None,
+) -> pd.DataFrame:
+    # One row per sample and (k, s) pair. Samples are loaded as in
+    # run_workspace_batch and sent to worker processes in chunks.
+    grid = [(k, s) for k in smoothing_degrees for s in smoothing_factors]
+    workspace = Workspace(
+        cache=cache, max_workers=max_workers, processes=True, streaming=streaming
+    )
+    if store is not None:
+        workspace.open_store(store)
+    failed = workspace.add_files(files)
+    catalogue = workspace.get_catalogue()
+    samples = catalogue.get_samples()
+    chunks = [
+        samples[start : start + SAMPLES_PER_TASK]
+        for start in range(0, len(samples), SAMPLES_PER_TASK)
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        sample_rows = [
+            row
+            for rows in executor.map(
+                _sweep_samples,
+                chunks,
+                [grid] * len(chunks),
+                [knee_method] * len(chunks),
+            )
+            for row in rows
+        ]
+
+    rows = list()
+    for file_name, error in failed.items():
+        logger.warning("%s failed: %s: %s", file_name, type(error).__name__, error)
+        rows.append(
+            {
+                "FILE": file_name,
+                "SAMP_NAME": None,
+                "SMOOTHING_DEGREE": np.nan,
+                "SMOOTHING_FACTOR": np.nan,
+                "PRECONSOLIDATION_KPA": np.nan,
+                "ERROR": f"{type(error).__name__}: {error}",
+            }
+        )
+    for i, (name, results) in enumerate(zip(catalogue.get_names(), sample_rows)):
+        file_name = ";".join(workspace.get_sources(i))
+        for (k, s), (p, message) in zip(grid, results):
+            rows.append(
+                {
+                    "FILE": file_name,
+                    "SAMP_NAME": name,
+                    "SMOOTHING_DEGREE": k,
+                    "SMOOTHING_FACTOR": s,
+                    "PRECONSOLIDATION_KPA": p,
+                    "ERROR": message,
+                }
+            )
+    df_sweep = pd.DataFrame(rows, columns=SWEEP_COLUMNS).astype(
+        {"SMOOTHING_DEGREE": "Int64"}
+    )
+    return df_sweep.sort_values(["FILE", "SAMP_NAME"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+def stability_table(df_sweep: pd.DataFrame) -> pd.DataFrame:
+    # Spread of each sample's p over the grid, most sensitive first.
+    # RELATIVE_SPREAD is (max - min) / median of the points that computed.
+    df_samples = df_sweep.dropna(subset=["SAMP_NAME"])
+    groups = df_samples.groupby(["FILE", "SAMP_NAME"], sort=False)[
+        "PRECONSOLIDATION_KPA"
+    ]
+    df_stability = groups.agg(
+        P_MIN_KPA="min",
+        P_MEDIAN_KPA="median",
+        P_MAX_KPA="max",
+        N_FAILED=lambda p: int(p.isna().sum()),
+    ).reset_index()
+    df_stability["RELATIVE_SPREAD"] = (
+        df_stability["P_MAX_KPA"] - df_stability["P_MIN_KPA"]
+    ) / df_stability["P_MEDIAN_KPA"]
+    return (
+        df_stability[STABILITY_COLUMNS]
+        .sort_values("RELATIVE_SPREAD", ascending=False, na_position="first")
+        .reset_index(drop=True)
+    )
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+from scipy.interpolate import UnivariateSpline
+
+
+class UncertaintyResult(NamedTuple):
+    p: np.ndarray  # One per realisation, NaN where the lines do not meet in range
+    e: np.ndarray
+    percentiles: tuple[float, ...]
+    p_percentiles: np.ndarray
+
+    @property
+    def n_failed(self) -> int:
+        return int(np.sum(np.isnan(self.p)))
+
+    def interval(self) -> tuple[float, float]:
+        return float(self.p_percentiles[0]), float(self.p_percentiles[-1])
+
+
+def _spline_terms(
+    log_loads: np.ndarray,
+    void_ratios: np.ndarray,
+    points: np.ndarray,
+    smoothing_degree: int,
+    smoothing_factor: float | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Value and slope of each realisation's spline at its own points, with
+    # void_ratios (R, n) and points (R, P). An interpolating spline's knots
+    # depend on the loads only, so it is linear in the void ratios and every
+    # realisation is a weighted sum of the n splines through unit vectors.
+    if smoothing_factor == 0:
+        values = np.zeros(points.shape)
+        slopes = np.zeros(points.shape)
+        for j, unit in enumerate(np.eye(len(log_loads))):
+            basis = UnivariateSpline(log_loads, unit, s=0, k=smoothing_degree)
+            values += void_ratios[:, [j]] * basis(points.ravel()).reshape(points.shape)
+            slopes += void_ratios[:, [j]] * basis(points.ravel(), nu=1).reshape(
+                points.shape
+            )
+        return values, slopes
+    # A smoothing spline chooses its knots from the data, so each is refitted
+    values = np.empty(points.shape)
+    slopes = np.empty(points.shape)
+    for r, ys in enumerate(void_ratios):
+        spline = UnivariateSpline(log_loads, ys, s=smoothing_factor, k=smoothing_degree)
+        values[r] = spline(points[r])
+        slopes[r] = spline(points[r], nu=1)
+    return values, slopes
+
+
+def _realise(
+    axial_loads: np.ndarray,
+    void_ratios: np.ndarray,
+    knee_x: float,
+    straight_line_xs: np.ndarray,
+    straight_line_ys: np.ndarray,
+    smoothing_degree: int,
+    smoothing_factor: float | None,
+    n_realisations: int,
+    void_ratio_sigma: float,
+    handle_sigma: float,
+    seed: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Reruns the construction for n_realisations perturbed copies at once.
+    # Void ratios take Gaussian noise, the knee and straightest line handles
+    # move along the perturbed spline by Gaussian steps in log10 load.
+    rng = np.random.default_rng(seed)
+    log_loads = np.log10(axial_loads)
+    log_min, log_max = log_loads[0], log_loads[-1]
+    ys = void_ratios + rng.normal(0, void_ratio_sigma, (n_realisations, len(log_loads)))
+    knees = np.clip(
+        np.log10(knee_x) + rng.normal(0, handle_sigma, n_realisations),
+        log_min,
+        log_max,
+    )
+    handles = np.clip(
+        np.log10(straight_line_xs)
+        + rng.normal(0, handle_sigma, (n_realisations, len(straight_line_xs))),
+        log_min,
+        log_max,
+    )
+    # Handles keep their offset from the unperturbed spline, so a handle left
+    # on a measured point of a smoothing spline stays on it
+    offsets = straight_line_ys - UnivariateSpline(
+        log_loads, void_ratios, s=smoothing_factor, k=smoothing_degree
+    )(np.log10(straight_line_xs))
+
+    values, slopes = _spline_terms(
+        log_loads,
+        ys,
+        np.column_stack([knees, handles]),
+        smoothing_degree,
+        smoothing_factor,
+    )
+    bisector_slopes = slopes[:, 0] / 2
+    bisector_intercepts = values[:, 0] - bisector_slopes * knees
+
+    handle_ys = values[:, 1:] + offsets
+    centred = handles - handles.mean(axis=1, keepdims=True)
+    with np.errstate(all="ignore"):
+        line_slopes = np.sum(centred * handle_ys, axis=1) / np.sum(
+            centred * centred, axis=1
+        )
+        line_intercepts = handle_ys.mean(axis=1) - line_slopes * handles.mean(axis=1)
+        log_p = (bisector_intercepts - line_intercepts) / (
+            line_slopes - bisector_slopes
+        )
+        e = line_slopes * log_p + line_intercepts
+        valid = (
+            ~np.isclose(line_slopes, bisector_slopes, rtol=0, atol=1e-12)
+            & (log_p >= knees)
+            & (log_p <= log_max)
+        )
+        p = 10**log_p
+    return np.where(valid, p, np.nan), np.where(valid, e, np.nan)
+
+
+def monte_carlo(
+    axial_loads: np.ndarray,
+    void_ratios: np.ndarray,
+    knee_x: float,
+    straight_line_xs: np.ndarray,
+    straight_line_ys: np.ndarray,
+    smoothing_degree: int = 2,
+    smoothing_factor: float | None = 0,
+    n_realisations: int = 10_000,
+    void_ratio_sigma: float = 0.002,
+    handle_sigma: float = 0.02,
+    percentiles: tuple[float, ...] = (5, 50, 95),
+    seed: int | None = None,
+    max_workers: int | None = 1,
+) -> UncertaintyResult:
+    # Spreads the realisations over max_workers processes in equal chunks,
+    # each with its own random stream. max_workers=None uses every core.
+    if n_realisations < 1:
+        raise ValueError("At least one realisation is required")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    arguments = (
+        np.asarray(axial_loads, dtype=float),
+        np.asarray(void_ratios, dtype=float),
+        knee_x,
+        np.asarray(straight_line_xs, dtype=float),
+        np.asarray(straight_line_ys, dtype=float),
+        smoothing_degree,
+        smoothing_factor,
+    )
+    n_chunks = max(1, min(max_workers, n_realisations))
+    chunks = np.diff(np.linspace(0, n_realisations, n_chunks + 1).astype(int))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sigmas = (void_ratio_sigma, handle_sigma)
+    if n_chunks == 1:
+        parts = [_realise(*arguments, n_realisations, *sigmas, seeds[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=n_chunks) as executor:
+            parts = list(
+                executor.map(
+                    _realise,
+                    *zip(*[(*arguments, n, *sigmas, s) for n, s in zip(chunks, seeds)]),
+                )
+            )
+    p = np.concatenate([part[0] for part in parts])
+    e = np.concatenate([part[1] for part in parts])
+    p_percentiles = (
+        np.nanpercentile(p, percentiles)
+        if not np.all(np.isnan(p))
+        else np.full(len(percentiles), np.nan)
+    )
+    return UncertaintyResult(
+        p=p,
+        e=e,
+        percentiles=tuple(percentiles),
+        p_percentiles=p_percentiles,
+    )
+
+
+if __name__ == "__main__":
+    pass
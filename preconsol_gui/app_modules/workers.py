@@ -0,0 +1,131 @@
+import logging
+from collections.abc import Callable
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerSignals(QObject):
+
+    done = Signal(int)
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+    progress = Signal(int, int)
+
+
+class Worker(QRunnable):
+    def __init__(
+        self, job_id: int, function: Callable, *args, with_progress=False, **kwargs
+    ) -> None:
+        super(Worker, self).__init__()
+        self.signals = WorkerSignals()
+        self._job_id = job_id
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        self._with_progress = with_progress
+        self._cancelled = False
+
+    def _report_progress(self, percent: int) -> None:
+        if not self._cancelled:
+            self.signals.progress.emit(self._job_id, percent)
+        return
+
+    def cancel(self) -> None:
+        self._cancelled = True
+        return
+
+    def run(self) -> None:
+        try:
+            if self._cancelled:
+                return
+            if self._with_progress:
+                self._kwargs["progress"] = self._report_progress
+            result = self._function(*self._args, **self._kwargs)
+        except Exception as error:
+            logger.debug("Job %d failed", self._job_id, exc_info=True)
+            if not self._cancelled:
+                self.signals.failed.emit(self._job_id, f"{error}")
+        else:
+            if not self._cancelled:
+                self.signals.finished.emit(self._job_id, result)
+        finally:
+            self.signals.done.emit(self._job_id)
+        return
+
+
+class JobRunner(QObject):
+
+    # Runs jobs of one kind on its own pool, newest first. Submitting a job
+    # cancels the previous one: if it has not started it is taken off the
+    # queue, otherwise its result is discarded when it finishes.
+    finished = Signal(object)
+    failed = Signal(str)
+    progress = Signal(int)
+    busy = Signal(bool)
+
+    def __init__(self, max_threads: int = 1, parent: QObject | None = None) -> None:
+        super(JobRunner, self).__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._job_id = 0
+        self._worker = None
+        self._workers = dict()  # Keeps running workers alive until they finish
+
+    def _on_done(self, job_id: int) -> None:
+        self._workers.pop(job_id, None)
+        return
+
+    def _on_failed(self, job_id: int, message: str) -> None:
+        if job_id == self._job_id:
+            self._worker = None
+            self.busy.emit(False)
+            self.failed.emit(message)
+        return
+
+    def _on_finished(self, job_id: int, result: object) -> None:
+        if job_id == self._job_id:
+            self._worker = None
+            self.busy.emit(False)
+            self.finished.emit(result)
+        return
+
+    def _on_progress(self, job_id: int, percent: int) -> None:
+        if job_id == self._job_id:
+            self.progress.emit(percent)
+        return
+
+    def cancel(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            if self._pool.tryTake(self._worker):
+                self._workers.pop(self._job_id, None)
+            self._worker = None
+            self.busy.emit(False)
+        return
+
+    def submit(
+        self, function: Callable, *args, with_progress: bool = False, **kwargs
+    ) -> int:
+        self.cancel()
+        self._job_id += 1
+        self._worker = Worker(
+            self._job_id, function, *args, with_progress=with_progress, **kwargs
+        )
+        self._worker.setAutoDelete(False)
+        self._worker.signals.done.connect(self._on_done)
+        self._worker.signals.finished.connect(self._on_finished)
+        self._worker.signals.failed.connect(self._on_failed)
+        self._worker.signals.progress.connect(self._on_progress)
+        self._workers[self._job_id] = self._worker
+        self.busy.emit(True)
+        self._pool.start(self._worker)
+        return self._job_id
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+
+if __name__ == "__main__":
+    pass
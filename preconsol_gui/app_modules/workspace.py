@@ -0,0 +1,183 @@
+import hashlib
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .ags_cache import ParsedAGSCache
+from .cons_store import open_cons_store, write_cons_store
+from .process_ags import load_cons_for_preconsolidation
+from .sample_index import SampleIndex
+
+
+class Workspace:
+
+    # A catalogue of the CONS samples from many AGS files. Files are parsed
+    # concurrently, then their samples are appended to one SampleIndex. A
+    # sample delivered again with the same name and data is kept once and
+    # tagged with every file it came from.
+    def __init__(
+        self,
+        cache: ParsedAGSCache | None = None,
+        max_workers: int | None = None,
+        processes: bool = False,
+        streaming: bool = True,
+    ) -> None:
+        self._cache = cache
+        self._max_workers = max_workers
+        self._processes = processes
+        self._streaming = streaming
+        self._lock = threading.Lock()  # Files are added from worker threads
+        self._generation = 0  # Bumped when the catalogue is replaced
+        self.clear()
+
+    def _append(self, file_name: str, index: SampleIndex) -> SampleIndex:
+        # Registers the file and returns its samples not yet in the catalogue
+        if self._positions is None:  # Opened from a store, keys not read yet
+            catalogue = self._catalogue
+            self._positions = {
+                self._sample_key(name, *catalogue.get_sample(i)): i
+                for i, name in enumerate(catalogue.get_names())
+            }
+        source = len(self._file_names)
+        self._file_names.append(file_name)
+        keep = list()
+        for i, name in enumerate(index.get_names()):
+            key = self._sample_key(name, *index.get_sample(i))
+            if key in self._positions:
+                self._sources[self._positions[key]].append(source)
+                continue
+            self._positions[key] = len(self._sources)
+            self._sources.append([source])
+            keep.append(i)
+        return index.take(keep)
+
+    def _load(
+        self, file_names: list[str], progress: Callable | None
+    ) -> tuple[dict, dict]:
+        loaded, failed = dict(), dict()
+        executor_class = ProcessPoolExecutor if self._processes else ThreadPoolExecutor
+        with executor_class(max_workers=self._max_workers) as executor:
+            futures = {
+                executor.submit(
+                    load_cons_for_preconsolidation,
+                    file_name,
+                    self._cache,
+                    self._streaming,
+                ): file_name
+                for file_name in file_names
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                file_name = futures[future]
+                try:
+                    df_cons = future.result()
+                    if df_cons is None:
+                        raise ValueError(
+                            "File has no CONS group with the required headings"
+                        )
+                    loaded[file_name] = SampleIndex.from_frame(df_cons)
+                except Exception as error:
+                    failed[file_name] = error
+                if progress is not None:
+                    progress(int(100 * done / len(futures)))
+        return loaded, failed
+
+    @staticmethod
+    def _sample_key(name: str, loads: np.ndarray, voids: np.ndarray) -> str:
+        digest = hashlib.blake2b(name.encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(loads, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(voids, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def add_files(
+        self, file_names: list[str | Path], progress: Callable | None = None
+    ) -> dict:
+        # Returns the files that could not be read and their errors. Files
+        # already in the workspace are skipped. Nothing is added if the
+        # workspace is cleared or replaced while the files are parsed.
+        with self._lock:
+            generation = self._generation
+            known = set(self._file_names)
+        file_names = list(
+            dict.fromkeys(
+                str(Path(f).resolve())
+                for f in file_names
+                if str(Path(f).resolve()) not in known
+            )
+        )
+        loaded, failed = self._load(file_names, progress)
+        with self._lock:
+            if generation != self._generation:
+                return failed
+            added = [
+                self._append(file_name, loaded[file_name])
+                for file_name in file_names  # Same order whichever parse ends first
+                if file_name in loaded and file_name not in self._file_names
+            ]
+            if added:
+                self._catalogue = SampleIndex.concat([self._catalogue, *added])
+        return failed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._store = None  # Directory of the memory-mapped store
+            self._file_names = list()
+            self._positions = dict()  # Sample key to catalogue position
+            self._sources = list()
+            self._catalogue = SampleIndex.from_frame(
+                pd.DataFrame(columns=["SAMP_NAME", "SAMP_ID", "CONS_INCF", "CONS_INCE"])
+            )
+        return
+
+    def get_catalogue(self) -> SampleIndex:
+        return self._catalogue
+
+    def get_file_names(self) -> list[str]:
+        return list(self._file_names)
+
+    def get_labels(self) -> list[str]:
+        # Sample names, with the source file added where a name is not unique
+        names = self._catalogue.get_names()
+        counts = pd.Series(names).value_counts()
+        return [
+            (
+                f"{name} ({Path(self.get_sources(i)[0]).name})"
+                if counts[name] > 1
+                else name
+            )
+            for i, name in enumerate(names)
+        ]
+
+    def get_sources(self, sample: int) -> list[str]:
+        return [self._file_names[source] for source in self._sources[sample]]
+
+    def open_store(self, directory: str | Path) -> None:
+        # Replaces the workspace with a memory-mapped store. Adding files to
+        # it afterwards copies the catalogue into memory.
+        catalogue, file_names, sources = open_cons_store(directory)
+        with self._lock:
+            self._generation += 1
+            self._store = Path(directory).resolve()
+            self._catalogue = catalogue
+            self._file_names = file_names
+            self._sources = sources
+            self._positions = None
+        return
+
+    def save_store(self, directory: str | Path) -> None:
+        # The open store cannot be replaced while its files are mapped
+        with self._lock:
+            if Path(directory).resolve() == self._store:
+                raise ValueError(f"{directory} is the open CONS store")
+            write_cons_store(
+                directory, self._catalogue, self._file_names, self._sources
+            )
+        return
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,395 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from app_modules.ags_cache import ParsedAGSCache
+from app_modules.cons_store import STORE_SUFFIX, is_cons_store
+from app_modules.batch import (
+    collect_ags_files,
+    run_batch,
+    run_workspace_batch,
+    write_results,
+)
+from app_modules.casagrande import CasagrandeEngine
+from app_modules.server import BATCH_WINDOW, DEFAULT_PORT, serve
+from app_modules.workspace import Workspace
+
+
+def _collect_inputs(args: argparse.Namespace) -> tuple[list[Path], str | None]:
+    # AGS files and at most one CONS store. Raises ValueError when there is
+    # nothing to process.
+    stores = [path for path in args.paths if is_cons_store(path)]
+    files = collect_ags_files(
+        [path for path in args.paths if path not in stores], recursive=args.recursive
+    )
+    if len(stores) > 1:
+        raise ValueError("Only one CONS store can be processed at a time")
+    if not files and not stores:
+        raise ValueError("No AGS files found")
+    if files:
+        logging.info("Processing %d AGS files", len(files))
+    if stores:
+        logging.info("Processing CONS store %s", stores[0])
+    return files, stores[0] if stores else None
+
+
+def _load_workspace(args: argparse.Namespace) -> Workspace:
+    files, store = _collect_inputs(args)
+    cache = ParsedAGSCache(args.cache_dir, enabled=False if args.no_cache else None)
+    workspace = Workspace(
+        cache=cache,
+        max_workers=args.workers,
+        processes=True,
+        streaming=not args.full_parse,
+    )
+    if store is not None:
+        workspace.open_store(store)
+    for file_name, error in workspace.add_files(files).items():
+        logging.warning("%s failed: %s: %s", file_name, type(error).__name__, error)
+    return workspace
+
+
+def batch(args: argparse.Namespace) -> int:
+    try:
+        files, store = _collect_inputs(args)
+    except ValueError as error:
+        logging.error(error)
+        return 1
+    cache = ParsedAGSCache(args.cache_dir, enabled=False if args.no_cache else None)
+    if store is not None:
+        df_results = run_workspace_batch(
+            files,
+            max_workers=args.workers,
+            streaming=not args.full_parse,
+            cache=cache,
+            store=store,
+        )
+    else:
+        df_results = (run_workspace_batch if args.dedupe else run_batch)(
+            files, max_workers=args.workers, streaming=not args.full_parse, cache=cache
+        )
+    write_results(df_results, args.output)
+    failures = (df_results["ERROR"] != "").sum()
+    logging.info(
+        "Wrote %d results to %s (%d failed)", len(df_results), args.output, failures
+    )
+    return 0
+
+
+def export(args: argparse.Namespace) -> int:
+    # Imported here so other commands, and the server's spawned workers that
+    # re-import this module, do not load matplotlib
+    from app_modules.export import EXPORT_FORMATS, export_pdf, export_plots
+
+    if not args.formats and not args.pdf:
+        logging.error("Nothing to export, give --format and/or --pdf")
+        return 1
+    unknown = set(args.formats) - set(EXPORT_FORMATS)
+    if unknown:
+        logging.error("Cannot export to %s", ", ".join(sorted(unknown)))
+        return 1
+    try:
+        workspace = _load_workspace(args)
+    except ValueError as error:
+        logging.error(error)
+        return 1
+    names = workspace.get_labels()
+    samples = workspace.get_catalogue().get_samples()
+    failed = dict()
+    if args.formats:
+        failed.update(
+            export_plots(
+                names,
+                samples,
+                args.output,
+                formats=tuple(args.formats),
+                dpi=args.dpi,
+                max_workers=args.workers,
+            )
+        )
+        logging.info("Wrote %d samples to %s", len(names) - len(failed), args.output)
+    if args.pdf:
+        failed.update(export_pdf(names, samples, args.pdf, dpi=args.dpi))
+        logging.info("Wrote %d pages to %s", len(names) - len(failed), args.pdf)
+    for name, error in failed.items():
+        logging.warning("%s failed: %s", name, error)
+    return 0
+
+
+def pack(args: argparse.Namespace) -> int:
+    files = collect_ags_files(args.paths, recursive=args.recursive)
+    if not files:
+        logging.error("No AGS files found")
+        return 1
+    output = Path(args.output)
+    if output.suffix != STORE_SUFFIX:
+        output = output.with_name(output.name + STORE_SUFFIX)
+    logging.info("Packing %d AGS files", len(files))
+    cache = ParsedAGSCache(args.cache_dir, enabled=False if args.no_cache else None)
+    workspace = Workspace(cache=cache, max_workers=args.workers, processes=True)
+    for file_name, error in workspace.add_files(files).items():
+        logging.warning("%s failed: %s: %s", file_name, type(error).__name__, error)
+    try:
+        workspace.save_store(output)
+    except (OSError, ValueError) as error:
+        logging.error(error)
+        return 1
+    logging.info(
+        "Wrote %d samples from %d files to %s",
+        len(workspace.get_catalogue()),
+        len(workspace.get_file_names()),
+        output,
+    )
+    return 0
+
+
+def serve_command(args: argparse.Namespace) -> int:
+    try:
+        serve(
+            args.host,
+            args.port,
+            max_workers=args.workers,
+            batch_window=args.batch_window_ms / 1000,
+        )
+    except (OSError, ValueError) as error:
+        logging.error(error)
+        return 1
+    return 0
+
+
+def sweep(args: argparse.Namespace) -> int:
+    from app_modules.sweep import plot_stability_heatmap, run_sweep, stability_table
+
+    try:
+        files, store = _collect_inputs(args)
+    except ValueError as error:
+        logging.error(error)
+        return 1
+    logging.info(
+        "Sweeping %d smoothing degrees and %d smoothing factors",
+        len(args.degrees),
+        len(args.factors),
+    )
+    cache = ParsedAGSCache(args.cache_dir, enabled=False if args.no_cache else None)
+    df_sweep = run_sweep(
+        files,
+        args.degrees,
+        args.factors,
+        knee_method=args.knee_method,
+        max_workers=args.workers,
+        streaming=not args.full_parse,
+        cache=cache,
+        store=store,
+    )
+    write_results(df_sweep, args.output)
+    df_stability = stability_table(df_sweep)
+    if args.stability:
+        write_results(df_stability, args.stability)
+    if args.heatmap:
+        plot_stability_heatmap(df_sweep, args.heatmap)
+    logging.info(
+        "Wrote %d results for %d samples to %s",
+        len(df_sweep),
+        len(df_stability),
+        args.output,
+    )
+    for row in df_stability.dropna(subset=["RELATIVE_SPREAD"]).head(5).itertuples():
+        logging.info(
+            "%s %s: p %.0f to %.0f kPa (spread %.0f%%)",
+            row.FILE,
+            row.SAMP_NAME,
+            row.P_MIN_KPA,
+            row.P_MAX_KPA,
+            row.RELATIVE_SPREAD * 100,
+        )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Estimate preconsolidation pressure from AGS4 files without the GUI."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Compute preconsolidation pressure for every CONS sample."
+    )
+    batch_parser.add_argument(
+        "paths", nargs="+", help="AGS files, directories or a CONS store."
+    )
+    batch_parser.add_argument(
+        "-o", "--output", default="preconsolidation.csv", help="CSV or Parquet file."
+    )
+    batch_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Worker processes."
+    )
+    batch_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search directories recursively."
+    )
+    batch_parser.add_argument(
+        "--full-parse",
+        action="store_true",
+        help="Parse every AGS group instead of streaming only CONS.",
+    )
+    batch_parser.add_argument(
+        "--cache-dir", default=None, help="Directory for the parsed AGS cache."
+    )
+    batch_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not read or write the cache."
+    )
+    batch_parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Compute samples repeated across files once, listing every source file.",
+    )
+    batch_parser.set_defaults(func=batch)
+
+    pack_parser = subparsers.add_parser(
+        "pack", help="Write the CONS samples of AGS files to a memory-mapped store."
+    )
+    pack_parser.add_argument("paths", nargs="+", help="AGS files or directories.")
+    pack_parser.add_argument(
+        "-o", "--output", default=f"cons{STORE_SUFFIX}", help="Store directory."
+    )
+    pack_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Worker processes."
+    )
+    pack_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search directories recursively."
+    )
+    pack_parser.add_argument(
+        "--cache-dir", default=None, help="Directory for the parsed AGS cache."
+    )
+    pack_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not read or write the cache."
+    )
+    pack_parser.set_defaults(func=pack)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Save the plot of every CONS sample."
+    )
+    export_parser.add_argument(
+        "paths", nargs="+", help="AGS files, directories or a CONS store."
+    )
+    export_parser.add_argument(
+        "-o", "--output", default="plots", help="Directory for the plot files."
+    )
+    export_parser.add_argument(
+        "-f",
+        "--formats",
+        nargs="*",
+        default=["png"],
+        help="File formats: png, svg or pdf, one file per sample and format.",
+    )
+    export_parser.add_argument(
+        "--pdf", default=None, help="Also write every plot to one multi-page PDF."
+    )
+    export_parser.add_argument(
+        "--dpi", type=float, default=100, help="Resolution of raster formats."
+    )
+    export_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Worker processes."
+    )
+    export_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search directories recursively."
+    )
+    export_parser.add_argument(
+        "--full-parse",
+        action="store_true",
+        help="Parse every AGS group instead of streaming only CONS.",
+    )
+    export_parser.add_argument(
+        "--cache-dir", default=None, help="Directory for the parsed AGS cache."
+    )
+    export_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not read or write the cache."
+    )
+    export_parser.set_defaults(func=export)
+
+    sweep_parser = subparsers.add_parser(
+        "sweep",
+        help="Compute every sample over a grid of spline degrees and smoothing factors.",
+    )
+    sweep_parser.add_argument(
+        "paths", nargs="+", help="AGS files, directories or a CONS store."
+    )
+    sweep_parser.add_argument(
+        "-k",
+        "--degrees",
+        type=int,
+        nargs="+",
+        default=[1, 2, 3],
+        choices=range(1, 6),
+        help="Spline degrees.",
+    )
+    sweep_parser.add_argument(
+        "-s",
+        "--factors",
+        type=float,
+        nargs="+",
+        default=[0, 1e-5, 1e-4, 1e-3],
+        help="Spline smoothing factors.",
+    )
+    sweep_parser.add_argument(
+        "--knee-method", choices=CasagrandeEngine.KNEE_METHODS, default="kneedle"
+    )
+    sweep_parser.add_argument(
+        "-o", "--output", default="sweep.csv", help="CSV or Parquet file."
+    )
+    sweep_parser.add_argument(
+        "--stability",
+        default=None,
+        help="CSV or Parquet file for each sample's spread of p.",
+    )
+    sweep_parser.add_argument(
+        "--heatmap", default=None, help="Image file for the stability heatmap."
+    )
+    sweep_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Worker processes."
+    )
+    sweep_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Search directories recursively."
+    )
+    sweep_parser.add_argument(
+        "--full-parse",
+        action="store_true",
+        help="Parse every AGS group instead of streaming only CONS.",
+    )
+    sweep_parser.add_argument(
+        "--cache-dir", default=None, help="Directory for the parsed AGS cache."
+    )
+    sweep_parser.add_argument(
+        "--no-cache", action="store_true", help="Do not read or write the cache."
+    )
+    sweep_parser.set_defaults(func=sweep)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve preconsolidation pressures as JSON over HTTP on localhost.",
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="Loopback address to listen on."
+    )
+    serve_parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Worker processes."
+    )
+    serve_parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=BATCH_WINDOW * 1000,
+        help="How long samples wait for other requests to batch with.",
+    )
+    serve_parser.set_defaults(func=serve_command)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
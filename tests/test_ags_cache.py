@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from preconsol_gui.app_modules.ags_cache import ParsedAGSCache
+
+
+def _frame(n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "SAMP_NAME": [f"S{i % 3}" for i in range(n)],
+            "CONS_INCF": [10.0 * (i + 1) for i in range(n)],
+            "CONS_INCE": [1.0 - 0.01 * i for i in range(n)],
+        }
+    )
+
+
+@pytest.fixture
+def ags_files(tmp_path):
+    files = list()
+    for i in range(8):
+        path = tmp_path / f"file_{i}.ags"
+        path.write_text(f'"GROUP","CONS"\n"{i}"\n')
+        files.append(str(path))
+    return files
+
+
+def test_round_trip(tmp_path, ags_files):
+    cache = ParsedAGSCache(tmp_path / "cache", enabled=True)
+    assert cache.get(ags_files[0]) is None
+    cache.put(ags_files[0], _frame(5))
+    pd.testing.assert_frame_equal(cache.get(ags_files[0]), _frame(5))
+    return
+
+
+def test_unusable_directory_falls_back(tmp_path, ags_files, caplog):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("")  # A file where the cache directory should be
+    cache = ParsedAGSCache(blocked / "cache", enabled=True)
+    cache.put(ags_files[0], _frame(5))
+    assert cache.get(ags_files[0]) is None
+    assert "parse cache" in caplog.text
+    return
+
+
+def test_format_version_misses_old_entries(tmp_path, ags_files):
+    cache = ParsedAGSCache(tmp_path / "cache", enabled=True)
+    cache.put(ags_files[0], _frame(5))
+    newer = ParsedAGSCache(tmp_path / "cache", enabled=True)
+    newer.FORMAT_VERSION = ParsedAGSCache.FORMAT_VERSION + 1
+    assert newer.get(ags_files[0]) is None
+    return
+
+
+def test_concurrent_puts_keep_every_index_entry(tmp_path, ags_files):
+    cache = ParsedAGSCache(tmp_path / "cache", enabled=True)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda f: cache.put(f, _frame(5)), ags_files))
+    assert len(cache._read_index()) == len(ags_files)
+    for file_name in ags_files:
+        assert cache.get(file_name) is not None
+    return
+
+
+def test_eviction_tolerates_removed_entries(tmp_path, ags_files):
+    cache = ParsedAGSCache(tmp_path / "cache", max_bytes=0, enabled=True)
+    for file_name in ags_files:
+        cache.put(file_name, _frame(5))
+    assert not list((tmp_path / "cache").glob("*.npz"))
+    cache.clear()
+    cache._evict()
+    return
@@ -0,0 +1,69 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# The GUI imports app_modules as a top-level package, as when run from its folder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "preconsol_gui"))
+
+import app  # noqa: E402
+from PySide6.QtCore import QThreadPool, Qt  # noqa: E402
+from PySide6.QtTest import QTest  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+AXIAL_LOADS = np.array([10.0, 20.0, 40.0, 80.0, 160.0, 320.0, 640.0, 1280.0])
+VOID_RATIOS = np.array([0.95, 0.94, 0.93, 0.91, 0.86, 0.78, 0.70, 0.62])
+
+
+def _wait_for(condition, timeout_ms: int = 30000) -> bool:
+    for _ in range(timeout_ms // 10):
+        if condition():
+            return True
+        QTest.qWait(10)
+    return condition()
+
+
+@pytest.fixture
+def window():
+    qapp = QApplication.instance() or QApplication([])
+    window = app.MainWindow()
+    yield window
+    window.edit_timer.stop()
+    QThreadPool.globalInstance().waitForDone()
+    qapp.processEvents()
+    window.close()
+    return
+
+
+@pytest.mark.parametrize("row", [0, 3])
+def test_edit_keeps_the_debounce_interval(window, row):
+    window.create_table(AXIAL_LOADS.copy(), VOID_RATIOS.copy())
+    assert window.model.setData(window.model.index(row, 1), "0.5", Qt.EditRole)
+    assert window.edit_timer.isActive()
+    assert window.edit_timer.interval() == window.EDIT_DEBOUNCE_MS
+    return
+
+
+def test_clear_workspace_resets_the_sample(window):
+    window.create_table(AXIAL_LOADS.copy(), VOID_RATIOS.copy())
+    assert _wait_for(lambda: window.base_result is not None)
+    window.model.setData(window.model.index(3, 1), "0.5", Qt.EditRole)
+    window.act_uncertainty_triggered()
+    window.act_clear_workspace_triggered()
+    assert window.base_result is None
+    assert window.table.model() is None
+    assert not window.edit_timer.isActive()
+    assert not window.consol.get_figure().axes[0].lines
+    # Neither the edit nor the uncertainty arrive after the clear
+    QTest.qWait(2 * window.EDIT_DEBOUNCE_MS)
+    assert window.base_result is None
+    assert not window.consol.get_figure().axes[0].lines
+    # The next sample draws as the first one did
+    window.create_table(AXIAL_LOADS.copy(), VOID_RATIOS.copy())
+    assert _wait_for(lambda: window.base_result is not None)
+    assert window.consol.get_figure().axes[0].lines
+    return
@@ -0,0 +1,141 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from preconsol_gui.app_modules.cons_store import (
+    STORE_SUFFIX,
+    is_cons_store,
+    open_cons_store,
+    write_cons_store,
+)
+from preconsol_gui.app_modules.workspace import Workspace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from synthetic import write_synthetic_ags  # noqa: E402
+
+
+@pytest.fixture
+def ags_files(tmp_path):
+    files = list()
+    for seed in range(3):
+        file_name = tmp_path / f"file_{seed}.ags"
+        write_synthetic_ags(file_name, n_samples=5, unload_reload_loops=1, seed=seed)
+        files.append(file_name)
+    return files
+
+
+@pytest.fixture
+def workspace(ags_files):
+    workspace = Workspace(max_workers=2)
+    assert workspace.add_files(ags_files[:2]) == {}
+    return workspace
+
+
+def _assert_same(opened: Workspace, workspace: Workspace) -> None:
+    catalogue, expected = opened.get_catalogue(), workspace.get_catalogue()
+    assert list(catalogue.get_names()) == list(expected.get_names())
+    assert opened.get_file_names() == workspace.get_file_names()
+    for i in range(len(expected)):
+        assert opened.get_sources(i) == workspace.get_sources(i)
+        assert catalogue.get_sample_id(i) == expected.get_sample_id(i)
+        for array, expected_array in zip(
+            catalogue.get_sample(i), expected.get_sample(i)
+        ):
+            np.testing.assert_array_equal(array, expected_array)
+        np.testing.assert_array_equal(
+            catalogue.get_increments(i), expected.get_increments(i)
+        )
+    return
+
+
+def test_round_trip(tmp_path, workspace):
+    store = tmp_path / f"samples{STORE_SUFFIX}"
+    workspace.save_store(store)
+    assert is_cons_store(store)
+    opened = Workspace()
+    opened.open_store(store)
+    assert isinstance(opened.get_catalogue().get_sample(0)[0], np.memmap)
+    _assert_same(opened, workspace)
+    return
+
+
+def test_saving_again_replaces_the_store(tmp_path, workspace, ags_files):
+    store = tmp_path / f"samples{STORE_SUFFIX}"
+    workspace.save_store(store)
+    workspace.add_files(ags_files[2:])
+    workspace.save_store(store)
+    opened = Workspace()
+    opened.open_store(store)
+    _assert_same(opened, workspace)
+    return
+
+
+def test_refuses_to_replace_other_directories(tmp_path, workspace):
+    directory = tmp_path / "not_a_store"
+    directory.mkdir()
+    (directory / "keep.txt").write_text("keep")
+    catalogue = workspace.get_catalogue()
+    with pytest.raises(ValueError, match="not a CONS store"):
+        write_cons_store(directory, catalogue, workspace.get_file_names(), [])
+    assert [path.name for path in directory.iterdir()] == ["keep.txt"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [path.name for path in tmp_path.glob("*.ags")] + ["not_a_store"]
+    )
+    return
+
+
+def test_refuses_to_save_over_the_open_store(tmp_path, workspace):
+    store = tmp_path / f"samples{STORE_SUFFIX}"
+    workspace.save_store(store)
+    opened = Workspace()
+    opened.open_store(store)
+    with pytest.raises(ValueError, match="open CONS store"):
+        opened.save_store(store)
+    opened.save_store(tmp_path / f"copy{STORE_SUFFIX}")
+    opened.clear()
+    opened.save_store(store)  # No longer open
+    return
+
+
+def test_add_files_after_open_keeps_samples_once(tmp_path, workspace, ags_files):
+    store = tmp_path / f"samples{STORE_SUFFIX}"
+    workspace.save_store(store)
+    n_samples = len(workspace.get_catalogue())
+
+    opened = Workspace()
+    opened.open_store(store)
+    assert opened.add_files(ags_files[:1]) == {}  # Already in the store
+    assert len(opened.get_catalogue()) == n_samples
+
+    # The same samples delivered in another file are tagged with it too
+    copy = tmp_path / "copy.ags"
+    shutil.copy(ags_files[0], copy)
+    assert opened.add_files([copy]) == {}
+    assert len(opened.get_catalogue()) == n_samples
+    assert opened.get_sources(0) == [str(ags_files[0].resolve()), str(copy.resolve())]
+
+    assert opened.add_files(ags_files[2:]) == {}
+    expected = Workspace()
+    expected.add_files(ags_files[:1])
+    expected.add_files(ags_files[1:2])
+    expected.add_files([copy])
+    expected.add_files(ags_files[2:])
+    assert list(opened.get_catalogue().get_names()) == list(
+        expected.get_catalogue().get_names()
+    )
+    return
+
+
+def test_open_cons_store_sources(tmp_path, workspace):
+    store = tmp_path / f"samples{STORE_SUFFIX}"
+    workspace.save_store(store)
+    catalogue, file_names, sources = open_cons_store(store)
+    assert len(sources) == len(catalogue)
+    assert [[file_names[code] for code in codes] for codes in sources] == [
+        workspace.get_sources(i) for i in range(len(catalogue))
+    ]
+    return
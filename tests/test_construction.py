@@ -0,0 +1,150 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from preconsol_gui.app_modules.construction import (
+    NoIntersectionError,
+    line_intersection,
+    steepest_segment,
+)
+
+
+def _reference(xs: np.ndarray, ys: np.ndarray) -> tuple[tuple[int, ...], float, float]:
+    # The exhaustive sweep steepest_segment replaced: a least squares line
+    # through every subset of at least two points, shortest subsets first,
+    # keeping the first of equally steep lines. Slopes within rounding of
+    # each other count as equal, as in steepest_segment.
+    log_xs = np.log10(xs)
+    best = None
+    for size in range(2, len(xs) + 1):
+        for subset in combinations(range(len(xs)), size):
+            a = np.vstack([log_xs[list(subset)], np.ones(size)]).T
+            (slope, intercept), *_ = np.linalg.lstsq(a, ys[list(subset)], rcond=None)
+            if best is None or abs(slope) > abs(best[1]) * (1 + 1e-9):
+                best = subset, slope, intercept
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_steepest_segment_matches_combinations(seed):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(2, 9)
+    xs = np.sort(rng.choice(np.arange(10, 5000), size=n, replace=False)).astype(float)
+    ys = np.sort(rng.uniform(0.4, 1.2, size=n))[::-1]
+    ys += rng.normal(0, 0.05, size=n)
+    subset, slope, intercept = _reference(xs, ys)
+    start, stop, found_slope, found_intercept = steepest_segment(xs, ys)
+    assert tuple(range(start, stop)) == subset
+    assert found_slope == pytest.approx(slope, rel=1e-9)
+    assert found_intercept == pytest.approx(intercept, rel=1e-9, abs=1e-12)
+    return
+
+
+def test_steepest_segment_two_points():
+    xs, ys = np.array([100.0, 400.0]), np.array([0.9, 0.7])
+    subset, slope, intercept = _reference(xs, ys)
+    start, stop, found_slope, found_intercept = steepest_segment(xs, ys)
+    assert (start, stop) == (0, 2) == (subset[0], subset[-1] + 1)
+    assert found_slope == pytest.approx(slope)
+    assert found_intercept == pytest.approx(intercept)
+    return
+
+
+@pytest.mark.parametrize(
+    "ys",
+    [
+        [1.0, 0.8, 0.6, 0.4, 0.2],  # Every subset lies on one line
+        [1.0, 0.8, 0.8, 0.6, 0.6],  # Equally steep pairs apart
+        [1.0, 1.0, 0.8, 0.8, 0.6],
+    ],
+)
+def test_steepest_segment_ties(ys):
+    xs, ys = 10.0 ** np.arange(len(ys)), np.array(ys)
+    subset, slope, intercept = _reference(xs, ys)
+    start, stop, found_slope, found_intercept = steepest_segment(xs, ys)
+    assert tuple(range(start, stop)) == subset
+    assert found_slope == pytest.approx(slope)
+    assert found_intercept == pytest.approx(intercept)
+    return
+
+
+def test_steepest_segment_needs_two_points():
+    with pytest.raises(ValueError):
+        steepest_segment(np.array([100.0]), np.array([0.9]))
+    return
+
+
+def _grid_intersection(
+    slope_a: float,
+    intercept_a: float,
+    slope_b: float,
+    intercept_b: float,
+    x_min: float,
+    x_max: float,
+) -> np.ndarray:
+    # The grid search line_intersection replaced took the first of 10,000
+    # loads between the knee and the last load where the lines agreed,
+    # loosening the tolerance until one did. Returns every load agreeing at
+    # that tolerance, as any of them is within its accuracy.
+    xs = np.linspace(x_min, x_max, 10_000)
+    a = slope_a * np.log10(xs) + intercept_a
+    b = slope_b * np.log10(xs) + intercept_b
+    for exponent in range(-8, 3):
+        solution = np.isclose(a, b, rtol=10**exponent)
+        if solution.any():
+            return xs[solution]
+    return np.empty(0)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_line_intersection_matches_grid_search(seed):
+    rng = np.random.default_rng(seed)
+    x_min, x_max = rng.uniform(50, 200), rng.uniform(1000, 5000)
+    x = 10 ** rng.uniform(np.log10(x_min) + 0.1, np.log10(x_max) - 0.1)
+    e = rng.uniform(0.5, 1.0)
+    slope_a, slope_b = rng.uniform(-0.1, -0.02), rng.uniform(-0.6, -0.2)
+    intercept_a = e - slope_a * np.log10(x)
+    intercept_b = e - slope_b * np.log10(x)
+    found = line_intersection(
+        slope_a, intercept_a, slope_b, intercept_b, x_min=x_min, x_max=x_max
+    )
+    assert found == pytest.approx((x, e))
+    grid_xs = _grid_intersection(
+        slope_a, intercept_a, slope_b, intercept_b, x_min, x_max
+    )
+    step = (x_max - x_min) / (10_000 - 1)
+    assert grid_xs[0] - step <= found[0] <= grid_xs[-1] + step
+    return
+
+
+def test_line_intersection_without_limits():
+    x, e = line_intersection(-0.1, 1.0, -0.3, 1.4)
+    assert (x, e) == pytest.approx((100.0, 0.8))
+    return
+
+
+@pytest.mark.parametrize("slope_b", [-0.2, -0.2 + 1e-13])
+def test_line_intersection_parallel(slope_b):
+    with pytest.raises(NoIntersectionError, match="parallel"):
+        line_intersection(-0.2, 1.0, slope_b, 0.9)
+    return
+
+
+@pytest.mark.parametrize(
+    "x_min, x_max, match",
+    [
+        (200.0, 1000.0, "below"),  # The lines meet at 100 kPa, before the knee
+        (10.0, 50.0, "above"),  # and after the last load
+    ],
+)
+def test_line_intersection_out_of_range(x_min, x_max, match):
+    with pytest.raises(NoIntersectionError, match=match):
+        line_intersection(-0.1, 1.0, -0.3, 1.4, x_min=x_min, x_max=x_max)
+    return
+
+
+def test_no_intersection_is_a_value_error():
+    # Callers catching ValueError for a failed construction still catch it
+    assert issubclass(NoIntersectionError, ValueError)
+    return
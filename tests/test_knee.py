@@ -0,0 +1,66 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from preconsol_gui.app_modules.knee import find_knee, find_knees, pad_curves
+
+kneed = pytest.importorskip("kneed")
+
+
+def _kneed_knee(
+    x: np.ndarray, y: np.ndarray, sensitivity: float
+) -> tuple[float, float]:
+    with warnings.catch_warnings():  # kneed warns when there is no knee
+        warnings.simplefilter("ignore")
+        locator = kneed.KneeLocator(
+            x, y, S=sensitivity, curve="concave", direction="decreasing"
+        )
+    if locator.knee is None:
+        return np.nan, np.nan
+    return float(locator.knee), float(locator.knee_y)
+
+
+def _curves(seed: int, n_curves: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    # Oedometer-like curves of log10(load) against void ratio with noise,
+    # plus a straight line with no knee and a flat curve
+    rng = np.random.default_rng(seed)
+    curves = list()
+    for _ in range(n_curves):
+        n = rng.integers(3, 16)
+        x = np.sort(rng.uniform(0.5, 4.0, size=n))
+        bend = rng.uniform(1.0, 3.5)
+        y = 1.0 - 0.02 * x - 0.3 * np.maximum(x - bend, 0) + rng.normal(0, 0.01, n)
+        curves.append((x, y))
+    curves.append((np.linspace(1.0, 3.0, 8), np.linspace(1.0, 0.5, 8)))
+    curves.append((np.linspace(1.0, 3.0, 8), np.full(8, 0.7)))
+    return curves
+
+
+@pytest.mark.parametrize("sensitivity", [0.5, 1.0, 2.0])
+def test_find_knee_matches_kneed(sensitivity):
+    for x, y in _curves(0, 60):
+        expected = _kneed_knee(x, y, sensitivity)
+        np.testing.assert_array_equal(find_knee(x, y, sensitivity), expected)
+    return
+
+
+def test_find_knees_ragged_and_padded_match_kneed():
+    curves = _curves(1, 100)
+    expected = np.array([_kneed_knee(x, y, 1.0) for x, y in curves]).T
+    xs = [x for x, _ in curves]
+    ys = [y for _, y in curves]
+    np.testing.assert_array_equal(find_knees(xs, ys), expected)
+    padded_xs, lengths = pad_curves(xs)
+    padded_ys, _ = pad_curves(ys)
+    np.testing.assert_array_equal(
+        find_knees(padded_xs, padded_ys, lengths=lengths), expected
+    )
+    return
+
+
+def test_find_knee_without_knee():
+    for x, y in _curves(2, 0):
+        assert np.isnan(_kneed_knee(x, y, 1.0)).all()
+        assert np.isnan(find_knee(x, y)).all()
+    return
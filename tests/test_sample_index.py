@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from preconsol_gui.app_modules.sample_index import SampleIndex
+
+COLUMNS = ["SAMP_NAME", "SAMP_ID", "CONS_INCF", "CONS_INCE", "CONS_INCN"]
+
+
+def _frame(seed: int, n_rows: int) -> pd.DataFrame:
+    # Interleaved samples of uneven length, as rows can arrive in any order
+    rng = np.random.default_rng(seed)
+    names = rng.choice([f"S{i}" for i in range(7)], size=n_rows)
+    return pd.DataFrame(
+        {
+            "SAMP_NAME": names,
+            "SAMP_ID": [f"ID_{name}" for name in names],
+            "CONS_INCF": rng.uniform(5, 3000, n_rows),
+            "CONS_INCE": rng.uniform(0.3, 1.2, n_rows),
+            "CONS_INCN": np.arange(1, n_rows + 1),
+        }
+    )
+
+
+def _assert_matches(index: SampleIndex, df: pd.DataFrame) -> None:
+    # Against a groupby in order of first appearance
+    groups = list(df.groupby("SAMP_NAME", sort=False))
+    assert len(index) == len(groups)
+    assert list(index.get_names()) == [name for name, _ in groups]
+    np.testing.assert_array_equal(index.get_lengths(), [len(g) for _, g in groups])
+    for i, (name, group) in enumerate(groups):
+        for sample in (i, name):
+            loads, voids = index.get_sample(sample)
+            np.testing.assert_array_equal(loads, group["CONS_INCF"])
+            np.testing.assert_array_equal(voids, group["CONS_INCE"])
+            np.testing.assert_array_equal(
+                index.get_increments(sample), group["CONS_INCN"]
+            )
+            assert index.get_sample_id(sample) == group["SAMP_ID"].iloc[0]
+        assert index.get_position(name) == i
+    return
+
+
+@pytest.mark.parametrize("seed, n_rows", [(0, 1), (1, 12), (2, 200)])
+def test_from_frame(seed, n_rows):
+    df = _frame(seed, n_rows)
+    _assert_matches(SampleIndex.from_frame(df), df)
+    return
+
+
+def test_from_empty_frame():
+    index = SampleIndex.from_frame(pd.DataFrame(columns=COLUMNS))
+    assert len(index) == 0
+    assert index.get_samples() == []
+    return
+
+
+def test_samples_are_read_only_views():
+    index = SampleIndex.from_frame(_frame(3, 30))
+    loads, _ = index.get_sample(0)
+    with pytest.raises(ValueError):
+        loads[0] = 1.0
+    return
+
+
+@pytest.mark.parametrize("positions", [[], [0], [3, 1], [2, 2, 0], [4, 3, 2, 1, 0]])
+def test_take(positions):
+    df = _frame(4, 60)
+    index = SampleIndex.from_frame(df)
+    names = index.get_names()
+    taken = index.take(positions)
+    assert len(taken) == len(positions)
+    assert list(taken.get_names()) == [names[i] for i in positions]
+    for i, position in enumerate(positions):
+        for taken_array, array in zip(taken.get_sample(i), index.get_sample(position)):
+            np.testing.assert_array_equal(taken_array, array)
+        np.testing.assert_array_equal(
+            taken.get_increments(i), index.get_increments(position)
+        )
+    assert sum(taken.get_lengths()) == len(taken.get_arrays()["axial_loads_kpa"])
+    return
+
+
+def test_concat():
+    df_a, df_b = _frame(5, 40), _frame(6, 25)
+    df_b["SAMP_NAME"] = "B_" + df_b["SAMP_NAME"]
+    empty = SampleIndex.from_frame(pd.DataFrame(columns=COLUMNS))
+    index = SampleIndex.concat(
+        [empty, SampleIndex.from_frame(df_a), empty, SampleIndex.from_frame(df_b)]
+    )
+    _assert_matches(index, pd.concat([df_a, df_b], ignore_index=True))
+    return
+
+
+def test_concat_after_take():
+    df = _frame(7, 50)
+    index = SampleIndex.from_frame(df)
+    rejoined = SampleIndex.concat([index.take([]), index.take([0, 1]), index.take([])])
+    kept = df[df["SAMP_NAME"].isin(index.get_names()[:2])]
+    _assert_matches(rejoined, kept)
+    return
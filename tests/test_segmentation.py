@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from preconsol_gui.app_modules.knee import pad_curves
+from preconsol_gui.app_modules.segmentation import (
+    RELOADING,
+    UNLOADING,
+    VIRGIN_LOADING,
+    segment_curve,
+    segment_curves,
+    segment_loads,
+)
+
+V, U, R = VIRGIN_LOADING, UNLOADING, RELOADING
+
+
+def _running_max_filter(loads: np.ndarray) -> np.ndarray:
+    # The filter segmentation replaced: the first load, then every load above
+    # the last one kept
+    kept, mask = list(), list()
+    for i, load in enumerate(loads):
+        mask.append(i == 0 or load > kept[-1])
+        if mask[-1]:
+            kept.append(load)
+    return np.array(mask)
+
+
+@pytest.mark.parametrize(
+    "loads, branch, cycle",
+    [
+        (
+            [10, 20, 40, 20, 10, 20, 40, 80, 160],
+            [V, V, V, U, U, R, R, V, V],
+            [0, 0, 0, 1, 1, 1, 1, 1, 1],
+        ),
+        (
+            [10, 40, 20, 40, 80, 40, 20, 80, 160],
+            [V, V, U, R, V, U, U, R, V],
+            [0, 0, 1, 1, 1, 2, 2, 2, 2],
+        ),
+        (  # Repeated loads stay on their branch
+            [10, 40, 20, 20, 40, 40, 80],
+            [V, V, U, U, R, R, V],
+            [0, 0, 1, 1, 1, 1, 1],
+        ),
+        ([10, 20, 40], [V, V, V], [0, 0, 0]),
+        ([10], [V], [0]),
+    ],
+)
+def test_known_sequences(loads, branch, cycle):
+    loads = np.array(loads, dtype=float)
+    branches = segment_curve(loads, np.linspace(1.0, 0.5, len(loads)))
+    np.testing.assert_array_equal(branches.branch, branch)
+    np.testing.assert_array_equal(branches.cycle, cycle)
+    assert branches.n_cycles == cycle[-1]
+    np.testing.assert_array_equal(branches.virgin_loading, np.equal(branch, V))
+    np.testing.assert_array_equal(branches.unloading, np.equal(branch, U))
+    np.testing.assert_array_equal(branches.reloading, np.equal(branch, R))
+    return
+
+
+@pytest.mark.parametrize(
+    "loads",
+    [
+        [10, 20, np.nan, 40, 20, 10, 20, 80],
+        [10, 20, 40, np.nan, 20, 40, 80],
+        [np.nan, 10, 20, 40],  # No load rises above a missing first load
+        [10, np.nan, np.nan],
+    ],
+)
+def test_missing_loads_match_the_running_max_filter(loads):
+    loads = np.array(loads)
+    branches = segment_curve(loads, np.zeros(len(loads)))
+    np.testing.assert_array_equal(branches.virgin_loading, _running_max_filter(loads))
+    return
+
+
+def test_virgin_loading_matches_the_running_max_filter():
+    rng = np.random.default_rng(0)
+    curves = list()
+    for _ in range(500):
+        n = rng.integers(1, 20)
+        loads = rng.choice([5.0, 10, 20, 40, 80, 160, 320], size=n)
+        loads[rng.random(n) < 0.05] = np.nan
+        curves.append((loads, rng.random(n)))
+    for (loads, _), branches in zip(curves, segment_curves(curves)):
+        assert len(branches.branch) == len(loads)
+        np.testing.assert_array_equal(
+            branches.virgin_loading, _running_max_filter(loads)
+        )
+    return
+
+
+def test_padded_rows_match_ragged_rows():
+    rng = np.random.default_rng(1)
+    loads = [
+        rng.choice([10.0, 20, 40, 80], size=rng.integers(1, 12)) for _ in range(50)
+    ]
+    padded, lengths = pad_curves(loads)
+    branch, cycle = segment_loads(padded, lengths)
+    ragged_branch, ragged_cycle = segment_loads(loads)
+    np.testing.assert_array_equal(branch, ragged_branch)
+    np.testing.assert_array_equal(cycle, ragged_cycle)
+    for row, length in enumerate(lengths):
+        assert (branch[row, length:] == -1).all()
+        np.testing.assert_array_equal(
+            branch[row, :length], segment_curve(loads[row], loads[row]).branch
+        )
+    return
+
+
+def test_segment_curves_keeps_the_arrays():
+    loads, voids = np.array([10.0, 20, 10, 40]), np.array([0.9, 0.8, 0.82, 0.7])
+    branches = segment_curves([(loads, voids), (loads[:2], voids[:2])])
+    np.testing.assert_array_equal(branches[0].axial_loads, loads)
+    np.testing.assert_array_equal(branches[0].void_ratios, voids)
+    np.testing.assert_array_equal(branches[1].branch, [V, V])
+    return
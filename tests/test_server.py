@@ -0,0 +1,133 @@
+import http.client
+import json
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from preconsol_gui.app_modules.casagrande import CasagrandeEngine
+from preconsol_gui.app_modules.server import make_server
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from synthetic import synthetic_curve, write_synthetic_ags  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = make_server("127.0.0.1", 0, max_workers=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.service.close()
+    server.server_close()
+    return
+
+
+@pytest.fixture
+def connection(server):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=60)
+    yield connection
+    connection.close()
+    return
+
+
+def _request(
+    connection: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: bytes | dict | None = None,
+) -> tuple[int, dict]:
+    if isinstance(body, dict):
+        body = json.dumps(body).encode()
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def _sample(curve: tuple[np.ndarray, np.ndarray], **fields) -> dict:
+    return dict(
+        axial_loads_kpa=curve[0].tolist(), void_ratios=curve[1].tolist(), **fields
+    )
+
+
+def test_compute_matches_the_engine(connection):
+    rng = np.random.default_rng(0)
+    curves = [
+        synthetic_curve(noise=0.002, unload_reload_loops=1, rng=rng) for _ in range(3)
+    ]
+    engine = CasagrandeEngine(cache_capacity=0)
+    status, payload = _request(connection, "POST", "/compute", _sample(curves[0]))
+    assert status == 200
+    assert payload["results"][0]["preconsolidation_kpa"] == pytest.approx(
+        engine.compute(*curves[0]).p
+    )
+    status, payload = _request(
+        connection,
+        "POST",
+        "/compute",
+        {"samples": [_sample(c, name=f"S{i}") for i, c in enumerate(curves)]},
+    )
+    assert status == 200
+    assert [r["sample"] for r in payload["results"]] == ["S0", "S1", "S2"]
+    assert [r["preconsolidation_kpa"] for r in payload["results"]] == pytest.approx(
+        [engine.compute(*c).p for c in curves]
+    )
+    return
+
+
+def test_compute_without_samples_makes_no_batch(server, connection):
+    batches = server.service.get_metrics()["batches"]
+    assert _request(connection, "POST", "/compute", {"samples": []}) == (
+        200,
+        {"results": []},
+    )
+    assert server.service.get_metrics()["batches"] == batches
+    return
+
+
+def test_ags(connection, tmp_path):
+    file_name = tmp_path / "server.ags"
+    write_synthetic_ags(file_name, n_samples=4)
+    status, payload = _request(
+        connection, "POST", "/ags?smoothing_degree=2", file_name.read_bytes()
+    )
+    assert status == 200
+    assert len(payload["results"]) == 4
+    return
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/compute", b"{not json"),
+        ("/compute", b"[1, 2]"),
+        ("/compute", {"axial_loads_kpa": [1, 2], "void_ratios": [1]}),
+        ("/compute", {"samples": [], "knee_method": "nope"}),
+        ("/ags", b"not an AGS file"),
+        ("/ags?smoothing_degree=9", b""),
+    ],
+)
+def test_bad_requests(connection, path, body):
+    status, payload = _request(connection, "POST", path, body)
+    assert status == 400
+    assert payload["error"]
+    return
+
+
+@pytest.mark.parametrize(
+    "path, body, status",
+    [
+        ("/ags?smoothing_degree=9", b"x" * 100, 400),
+        ("/nope", b"y" * 50, 404),
+        ("/compute", b"[1]", 400),
+    ],
+)
+def test_keep_alive_after_errors(connection, path, body, status):
+    # The error's unread body must not be taken for the next request
+    assert _request(connection, "POST", path, body)[0] == status
+    assert _request(connection, "GET", "/health") == (200, {"status": "ok"})
+    return